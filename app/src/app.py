@@ -10,72 +10,173 @@
 • Обновлены docstring и мелкие комментарии.
 """
 
+import argparse
 import os
-import datetime as _dt
 import warnings
-from typing import Tuple, Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-from scipy import stats
-import argparse
+from dataclasses import replace
 
-from function.func import *
+from function.func import (MIN_SELECTED_YEARS, RENDER_PROFILES, SELECTIONS_DIR, create_project_structure,
+                           select_panel, selection_label, set_render_profile)
 from function.create import analysis, data_build, reports
 from function.export import save
+from function.scheduler import Stage, run_stages, select_stages
+from function.cache import ArtifactCache
+from function import fx, memo, tracing
 
 warnings.filterwarnings("ignore")
 
-# ─────────────────────────── DISPLAY SETTINGS ────────────────────────────
-pd.options.display.float_format = lambda x: f"{x:.0f}" if pd.notna(x) and x % 1 == 0 else f"{x:.2f}"
-plt.rcParams["font.family"] = ["DejaVu Sans"]  # поддержка кириллицы
-plt.rcParams["axes.unicode_minus"] = False
 
+# ─────────────────────────────── STAGES ───────────────────────────────
+# Каждый этап: имя, функция, входы (позиционные аргументы) и выходы.
+# Этапы без взаимных зависимостей выполняются параллельно.
+# base — папка данных (источники), out — папка результатов: та же base
+# для полной панели и vyborki/<выборка>/ для запусков с --countries/--years.
 
+STAGES = [
+    Stage("data", data_build.extended_data_2010_2025, ("base",), ("panel", "panel_countries")),
+    Stage("fx", fx.currency_volatility_panel, ("panel", "base"), ("fx_panel",)),
+    Stage("select", select_panel, ("fx_panel", "panel_countries", "select_countries", "select_years", "compact"),
+          ("df", "countries")),
+    Stage("clean_excel", save.clean_excel, ("df", "out", "selection"),
+          artifacts=("dannye/clean_dataset.xlsx",)),  # снимки dannye/snapshots/ дописываются, не кэшируются
+    Stage("analysis", analysis.comprehensive_analysis, ("df", "countries", "out"), ("corr_m", "c_corr", "p_corr", "corr_ci"),
+          artifacts=("grafiki/01_dinamika_kripto_2010_2025.png", "grafiki/02_inflation_vs_crypto.png")),
+    Stage("comparison", reports.countries_comparison_chart, ("df", "countries", "out"),
+          artifacts=("grafiki/03_countries_comparison_2025.png",)),
+    Stage("dynamics", data_build.interactive_dynamics_chart, ("df", "countries", "out"), ("fig_dynamic",),
+          artifacts=("grafiki/interactive_dynamics.html",)),
+    Stage("trust", analysis.trust_btc_analysis, ("df", "countries", "out"), ("trust_corr", "overall_trust", "fig_trust"),
+          artifacts=("grafiki/trust_vs_btc.html", "otchety/trust_btc_analysis.xlsx")),
+    Stage("extended", data_build.extended_correlation_analysis, ("df", "countries", "out"), ("extended_corr", "clusters", "regression", "fig_cluster", "fig_regression"),
+          artifacts=("grafiki/cluster_analysis.html", "grafiki/regression_trust_btc.html",
+                     "otchety/extended_correlation_analysis.xlsx")),
+    Stage("rolling", analysis.rolling_correlation_analysis, ("df", "countries", "rolling_window", "out"),
+          ("rolling_corr", "fig_rolling"), artifacts=("grafiki/rolling_correlations.html",)),
+    Stage("dashboard", reports.interactive_dashboard, ("out", *(name for name, _ in reports.DASHBOARD_FIGURES)),
+          artifacts=("grafiki/dashboard.html", "grafiki/plotly.min.js")),
+    # без artifacts — не кэшируется: файлы rynok/ не входят в ключ кэша
+    Stage("market", analysis.btc_market_analysis, ("df", "countries", "base", "out"), ("market_corr",)),
+    Stage("hypothesis", data_build.hypothesis_analysis, ("df", "countries", "out"), ("crisis_corr", "stable_corr", "transition_corr"),
+          artifacts=("hypothesis_analysis.html",)),
+    Stage("excel", reports.excel_reports, ("df", "countries", "corr_m", "c_corr", "p_corr", "corr_ci", "out"),
+          artifacts=("otchety/full_crypto_analysis_2010_2025.xlsx",)),
+    Stage("countries", data_build.country_analysis_pages_incremental, ("df", "countries", "corr_ci", "out", "workers"),
+          artifacts=("strany_analiz/index.html", "strany_analiz/*/*_analysis.html", "strany_analiz/*/*.png")),
+    Stage("summary", reports.results_summary, ("df", "countries", "c_corr", "p_corr", "out"),
+          artifacts=("rezultaty/osnovnye_vyvody.txt",)),
+    Stage("methodology", data_build.methodology_and_sources, ("out",),
+          artifacts=("rezultaty/metodologiya_i_istochniki.txt",)),
+    Stage("full_methodology", reports.full_methodology_document, ("out",),
+          artifacts=("rezultaty/polnaya_metodologiya_i_formuly.txt",)),
+    Stage("previews", reports.static_preview_charts, ("df", "countries", "out"),
+          artifacts=("grafiki/cluster_preview.png", "grafiki/regression_preview.png")),
+    Stage("index", reports.main_project_index, ("df", "countries", "c_corr", "p_corr", "corr_ci", "out"),
+          artifacts=("index.html",)),
+]
 
 # ─────────────────────────────── MAIN ────────────────────────────────
 
-def main():
+def main(workers=None, use_cache=True, stages=None, countries=None, years=None, profile="publication",
+         compact=False, rolling_window=analysis.ROLLING_WINDOW):
+    """Запуск конвейера
+
+    stages — имена этапов (с зависимостями), countries — коды стран,
+    years — (первый, последний) год; None — всё. Результаты выборки
+    пишутся в vyborki/<страны>_<годы>/, полные артефакты не трогаются. profile — профиль
+    отрисовки графиков (draft/publication). compact — панель с category и
+    узкими числовыми типами. rolling_window — окно скользящих корреляций (лет).
+    """
     print("🚀 АНАЛИЗ: Влияние доверия к государству на адопцию криптовалют")
     print("=" * 70)
     
-    base = create_project_structure()
-    df, countries = data_build.extended_data_2010_2025(base)
-    save.clean_excel(df, base)
-    corr_m, c_corr, p_corr = analysis.comprehensive_analysis(df, countries, base)
-    reports.countries_comparison_chart(df, countries, base)
-    
-    # НОВЫЕ АНАЛИЗЫ
-    data_build.interactive_dynamics_chart(df, countries, base)
-    trust_corr, overall_trust, fig_trust = analysis.trust_btc_analysis(df, countries, base)
-    extended_corr, clusters, regression = data_build.extended_correlation_analysis(df, countries, base)
-    crisis_corr, stable_corr, transition_corr = data_build.hypothesis_analysis(df, countries, base)
-    
-    reports.excel_reports(df, countries, corr_m, c_corr, p_corr, base)
-    data_build.country_analysis_pages(df, countries, base)
-    reports.results_summary(df, countries, c_corr, p_corr, base)
-    data_build.methodology_and_sources(base)
-    reports.full_methodology_document(base)
-    reports.static_preview_charts(df, countries, base)
-    reports.main_project_index(df, countries, c_corr, p_corr, base)
+    set_render_profile(profile)
     
-    # Финальная статистика
-    print("\n📊 КЛЮЧЕВЫЕ РЕЗУЛЬТАТЫ:")
-    print("=" * 50)
-    print(f"🏛️ Корреляция доверие-BTC: {overall_trust:.3f}")
-    print(f"📊 Корреляция HDI-BTC: {df['HDI'].corr(df['Crypto_Adoption']):.3f}")
-    print(f"📈 Корреляция инфляция-BTC: {df['Inflation'].corr(df['Crypto_Adoption']):.3f}")
-    print(f"🎯 Кластеров стран: {len(clusters['Кластер'].unique())}")
-    print(f"🏆 Лидер адопции 2025: {df[df['Year']==2025].loc[df[df['Year']==2025]['Crypto_Adoption'].idxmax(), 'Country_RU']}")
-    
-    print("🏁 Анализ завершен!")
+    selected = select_stages(STAGES, stages) if stages else STAGES
+    if not use_cache:
+        selected = [replace(s, func=data_build.country_analysis_pages) if s.name == "countries" else s
+                    for s in selected]
+    base = create_project_structure()
+    selection = selection_label(countries, years)
+    out = create_project_structure(os.path.join(base, SELECTIONS_DIR, selection)) if selection else base
+    memo.start_run(base)  # статистики, общие для этапов, считаются один раз за запуск
+    try:
+        with tracing.span("run"):
+            cache = ArtifactCache(out) if use_cache else None
+            context = {"base": base, "out": out, "selection": selection, "select_countries": countries,
+                       "select_years": years, "compact": compact, "rolling_window": rolling_window,
+                       "workers": workers}
+            # Тёплый старт: готовая панель из dannye/panel.feather, если источники не менялись
+            warm = save.load_warm_panel(base) if use_cache and any(s.name == "data" for s in selected) else None
+            if warm is not None:
+                context["fx_panel"], context["panel_countries"] = warm
+                selected = [s for s in selected if s.name not in ("data", "fx")]
+                print(f"⚡ Панель загружена из {save.WARM_PANEL}: источники не изменились")
+            ctx = run_stages(selected, context, workers=workers, cache=cache)
+            if warm is None and "fx_panel" in ctx:
+                save.write_warm_panel(ctx["fx_panel"], ctx["panel_countries"], base)
+        tracing.write_reports(out)
+        if stages and not {"trust", "extended"} <= {s.name for s in selected}:
+            print("🏁 Выбранные этапы выполнены!")
+            return
+        df, clusters, overall_trust = ctx["df"], ctx["clusters"], ctx["overall_trust"]
+        
+        # Финальная статистика
+        print("\n📊 КЛЮЧЕВЫЕ РЕЗУЛЬТАТЫ:")
+        print("=" * 50)
+        print(f"🏛️ Корреляция доверие-BTC: {overall_trust:.3f}")
+        print(f"📊 Корреляция HDI-BTC: {memo.corr(df, 'HDI', 'Crypto_Adoption'):.3f}")
+        print(f"📈 Корреляция инфляция-BTC: {memo.corr(df, 'Inflation', 'Crypto_Adoption'):.3f}")
+        print(f"🎯 Кластеров стран: {len(clusters['Кластер'].unique())}")
+        _, last = df.panel.year_range()
+        data_last = df.panel.year(last)
+        print(f"🏆 Лидер адопции {last}: {data_last.loc[data_last['Crypto_Adoption'].idxmax(), 'Country_RU']}")
+        
+        print("🏁 Анализ завершен!")
+    finally:
+        memo.end_run()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Анализ криптоадопции (2010-2025)")
+    parser.add_argument("--stages", default="",
+                        help=f"этапы через запятую (зависимости добавляются сами): {', '.join(s.name for s in STAGES)}")
+    parser.add_argument("--countries", default="", help="коды стран через запятую, напр. Ukraine,Poland")
+    parser.add_argument("--years", default="", help=f"годы: 2018-2025 (не меньше {MIN_SELECTED_YEARS} лет)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (1 — последовательно)")
+    parser.add_argument("--no-cache", action="store_true", help="пересобрать все артефакты")
+    parser.add_argument("--profile", choices=list(RENDER_PROFILES), default="publication",
+                        help="профиль графиков: draft — быстрый черновик, publication — 300 dpi")
+    parser.add_argument("--compact", action="store_true",
+                        help="компактная панель: category для атрибутов стран, узкие числовые типы")
+    parser.add_argument("--rolling-window", type=int, default=analysis.ROLLING_WINDOW,
+                        help="окно скользящих корреляций, лет")
+    args = parser.parse_args(argv)
+    if args.rolling_window < 2:
+        parser.error("окно скользящих корреляций — не меньше 2 лет")
+
+    years = None
+    if args.years:
+        first, _, last = args.years.partition("-")
+        try:
+            years = (int(first), int(last or first))
+        except ValueError:
+            parser.error(f"неверный диапазон лет: {args.years}")
+        if years[1] - years[0] + 1 < MIN_SELECTED_YEARS:
+            parser.error(f"диапазон лет {args.years}: нужно не меньше {MIN_SELECTED_YEARS} лет, напр. 2018-2025")
+    return dict(
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        stages=[s for s in args.stages.split(",") if s] or None,
+        countries=[c for c in args.countries.split(",") if c] or None,
+        years=years,
+        profile=args.profile,
+        compact=args.compact,
+        rolling_window=args.rolling_window,
+    )
 
 if __name__ == "__main__":
+    options = parse_args()
     try:
-        main()
+        main(**options)
     except Exception as exc:
         print(f"❌ Ошибка: {exc}")
         import traceback
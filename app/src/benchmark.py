@@ -0,0 +1,140 @@
+"""
+НАГРУЗОЧНЫЕ ТЕСТЫ КОНВЕЙЕРА НА СИНТЕТИЧЕСКИХ ПАНЕЛЯХ
+Каждый этап `app.main()` (кроме построения данных) запускается отдельно на
+панелях разного размера; замеряется время (wall/CPU) и, по флагу
+`--memory`, пиковый объём памяти (tracemalloc). Для каждого этапа
+выводится показатель масштабирования — наклон log(время) по log(строк):
+≈1 — линейный рост, заметно больше 1 — сверхлинейный.
+
+Пример:
+    python benchmark.py --tiers xs,s,monthly-s --stages analysis,excel,index
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import warnings
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from function.create import analysis, data_build, synthetic
+from function.scheduler import run_stages, select_stages
+from app import STAGES
+
+warnings.filterwarnings("ignore")
+
+# имя уровня: (число стран, периодов в году)
+TIERS = {
+    "xs": (6, 1),
+    "s": (60, 1),
+    "m": (600, 1),
+    "l": (5000, 1),
+    "monthly-s": (60, 12),
+    "monthly-m": (600, 12),
+}
+
+
+def _measured(name, func, results, memory):
+    """Обёртка функции этапа: время и (опционально) пик памяти"""
+    def run(*args):
+        if memory:
+            tracemalloc.start()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            return func(*args)
+        finally:
+            results[name] = {
+                "wall_s": time.perf_counter() - wall0,
+                "cpu_s": time.process_time() - cpu0,
+            }
+            if memory:
+                results[name]["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+    return run
+
+
+def bench_tier(tier, stage_names=None, memory=False, schema=None):
+    """Прогон выбранных этапов на синтетической панели уровня `tier`"""
+    n_countries, per_year = TIERS[tier]
+    df, countries = synthetic.synthetic_panel(n_countries, periods_per_year=per_year, schema=schema)
+    base = tempfile.mkdtemp(prefix=f"bench_{tier}_")
+    for sub in ("grafiki", "otchety", "dannye", "rezultaty"):
+        os.makedirs(os.path.join(base, sub), exist_ok=True)
+
+    timings = {}
+    stages = []
+    for s in STAGES:
+        if s.name in ("data", "fx", "select"):
+            continue
+        func = data_build.country_analysis_pages if s.name == "countries" else s.func
+        stages.append(replace(s, func=_measured(s.name, func, timings, memory)))
+    if stage_names:
+        stages = select_stages(stages, stage_names)
+
+    print(f"\n⏱️ Уровень {tier}: {n_countries} стран × {per_year} периодов/год = {len(df)} строк")
+    try:
+        run_stages(stages, {"df": df, "countries": countries, "base": base, "out": base, "selection": None,
+                            "rolling_window": analysis.ROLLING_WINDOW, "workers": None}, workers=1)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return len(df), timings
+
+
+def scaling_exponents(table: pd.DataFrame) -> pd.Series:
+    """Наклон log(wall) по log(строк) для каждого этапа"""
+    result = {}
+    for stage, grp in table.groupby("stage"):
+        grp = grp[grp["wall_s"] > 0]
+        if grp["rows"].nunique() >= 2:
+            result[stage] = np.polyfit(np.log(grp["rows"]), np.log(grp["wall_s"]), 1)[0]
+    return pd.Series(result, name="exponent", dtype="float64").sort_values(ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочные тесты этапов конвейера")
+    parser.add_argument("--tiers", default="xs,s,monthly-s",
+                        help=f"уровни через запятую: {', '.join(TIERS)}")
+    parser.add_argument("--stages", default="", help="этапы через запятую (по умолчанию все)")
+    parser.add_argument("--memory", action="store_true", help="замерять пиковую память (медленнее)")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "../data/trassirovka"),
+                        help="папка для benchmark.csv и benchmark.json")
+    args = parser.parse_args()
+
+    tiers = [t for t in args.tiers.split(",") if t]
+    unknown = [t for t in tiers if t not in TIERS]
+    if unknown:
+        parser.error(f"неизвестные уровни: {unknown}")
+    stage_names = {s for s in args.stages.split(",") if s}
+
+    schema = data_build.extended_data_2010_2025(None)[0].dtypes
+    records = []
+    for tier in tiers:
+        rows, timings = bench_tier(tier, stage_names, args.memory, schema)
+        for stage, m in timings.items():
+            records.append({"tier": tier, "rows": rows, "stage": stage, **m})
+
+    table = pd.DataFrame(records)
+    os.makedirs(args.out, exist_ok=True)
+    table.to_csv(os.path.join(args.out, "benchmark.csv"), index=False)
+    exponents = scaling_exponents(table)
+    with open(os.path.join(args.out, "benchmark.json"), "w", encoding="utf-8") as f:
+        json.dump({"runs": records, "exponents": exponents.round(3).to_dict()}, f, ensure_ascii=False, indent=1)
+
+    print("\n📊 РЕЗУЛЬТАТЫ (секунды):")
+    print(table.pivot_table(index="stage", columns="tier", values="wall_s")[tiers].round(3).to_string())
+    if args.memory:
+        print("\n💾 Пиковая память (МБ):")
+        print(table.pivot_table(index="stage", columns="tier", values="peak_mb")[tiers].round(1).to_string())
+    if len(exponents):
+        print("\n📈 Показатель масштабирования (1 ≈ линейно):")
+        print(exponents.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+ОБНОВЛЕНИЕ МАКРОИНДИКАТОРОВ ИЗ WORLD BANK
+Ряды «индикатор × страна» загружаются конкурентно (function.fetch), ответы
+кэшируются в `.cache/http/` — повторный запуск в сеть не ходит. Результат
+пишется в `app/data/indikatory/worldbank.csv` и при следующем запуске
+`app.py` заменяет соответствующие колонки панели.
+
+С `--mock` вместо api.worldbank.org поднимается локальная замена
+(function.mock_worldbank), а таблица по умолчанию пишется в `.cache/`,
+чтобы синтетические значения не попали в данные проекта.
+
+Пример:
+    python fetch_data.py --indicators GDP_Per_Capita,Inflation --years 2015-2025
+    python fetch_data.py --mock --delay 0.2
+"""
+
+import argparse
+import os
+import time
+from contextlib import nullcontext
+
+from function import fetch
+from function.cache import CACHE_DIR
+from function.func import DATA_DIR, INDICATORS_DIR, PANEL_DECIMALS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Загрузка макроиндикаторов World Bank")
+    parser.add_argument("--countries", default="", help=f"коды стран через запятую (по умолчанию все: "
+                                                        f"{', '.join(fetch.COUNTRY_ISO3)})")
+    parser.add_argument("--indicators", default="", help=f"колонки панели через запятую (по умолчанию все: "
+                                                         f"{', '.join(fetch.WB_INDICATORS)})")
+    parser.add_argument("--years", default="2010-2025", help="годы: 2010-2025")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных запросов")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="срок годности кэша ответов, часов (по умолчанию бессрочно)")
+    parser.add_argument("--out", default=None, help="путь CSV (по умолчанию indikatory/worldbank.csv)")
+    parser.add_argument("--mock", action="store_true", help="локальная замена API вместо api.worldbank.org")
+    parser.add_argument("--delay", type=float, default=0.0, help="задержка ответа замены API, с (с --mock)")
+    args = parser.parse_args(argv)
+
+    first, _, last = args.years.partition("-")
+    try:
+        args.years = (int(first), int(last or first))
+    except ValueError:
+        parser.error(f"неверный диапазон лет: {args.years}")
+    args.countries = [c for c in args.countries.split(",") if c] or list(fetch.COUNTRY_ISO3)
+    args.indicators = [i for i in args.indicators.split(",") if i] or list(fetch.WB_INDICATORS)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base = DATA_DIR
+    out = args.out or (os.path.join(base, CACHE_DIR, "worldbank_mock.csv") if args.mock
+                       else os.path.join(base, INDICATORS_DIR, "worldbank.csv"))
+
+    if args.mock:
+        from function import mock_worldbank
+        server_context = mock_worldbank.serve(delay=args.delay)
+    else:
+        server_context = nullcontext()
+
+    with server_context as server:
+        base_url = server.base_url if server else fetch.WORLD_BANK_URL
+        print(f"🌐 {len(args.indicators)} индикаторов × {len(args.countries)} стран, {base_url}")
+        start = time.perf_counter()
+        table, stats = fetch.fetch_indicators(
+            base, args.countries, args.indicators, years=args.years, base_url=base_url,
+            source="mock" if args.mock else "worldbank", concurrency=args.concurrency,
+            max_age=args.max_age * 3600 if args.max_age is not None else None,
+        )
+        elapsed = time.perf_counter() - start
+
+    print(f"⏱️ {elapsed:.2f} с: из сети {stats['network']}, из кэша {stats['cached']} запросов")
+    if table.empty:
+        print("⚠️ World Bank не вернул данных — файл не записан")
+        return
+    for col in args.indicators:
+        table[col] = table[col].round(PANEL_DECIMALS.get(col) or 0)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"💾 {len(table)} строк → {os.path.relpath(out)}")
+
+
+if __name__ == "__main__":
+    main()
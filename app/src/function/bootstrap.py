@@ -0,0 +1,192 @@
+"""
+Бутстреп-интервалы для корреляций по группам.
+
+Для каждой группы (страна, период, вся панель) один раз строится матрица
+индексов повторных выборок (реплики × строки группы); она переводится в
+матрицу кратностей W, и суммы для всех пар колонок получаются одним
+матричным произведением W @ M, где M — центрированные моменты строк
+(наличие пары, x, y, x², y², xy). Тысячи реплик считаются без циклов по
+репликам и парам.
+
+Интервалы — перцентильный и BCa. Для BCa поправка смещения z0 берётся
+из доли реплик ниже оценки, ускорение a — из jackknife, который для
+корреляции считается вычитанием вклада строки из полных сумм, без n
+пересчётов.
+
+Реплики режутся на блоки фиксированного размера (зависит только от числа
+строк группы), и у каждого блока своё зерно из (seed, группа, блок):
+результат не зависит ни от числа процессов, ни от набора других групп.
+На больших панелях блоки считаются на пуле процессов.
+"""
+
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from function.correlation import _group_rows, grouped_corr
+from function.tracing import span
+
+BOOT_REPLICATES = 2000
+BOOT_LEVEL = 0.95
+BOOT_SEED = 2025
+BLOCK_CELLS = 1 << 22           # реплики × строки в одном блоке (~32 МБ на матрицу)
+PARALLEL_MIN_CELLS = 50_000_000  # меньше — считаем в текущем процессе
+
+CI_COLUMNS = ["B", "CI_low", "CI_high", "BCa_low", "BCa_high"]
+
+
+# ─────────────────────────────── MOMENTS ─────────────────────────────────
+
+def _moments(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Центрированные моменты строк (n × 6P) и полные суммы квадратов (2P)
+
+    Колонки блоками по P: наличие пары, x, y, x², y², xy. Центрирование
+    средними группы не меняет корреляцию, но убирает потерю точности.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        count = valid.sum(axis=0)
+        xc = np.where(valid, x - np.where(valid, x, 0.0).sum(axis=0) / count, 0.0)
+        yc = np.where(valid, y - np.where(valid, y, 0.0).sum(axis=0) / count, 0.0)
+    moments = np.hstack([valid.astype(np.float64), xc, yc, xc * xc, yc * yc, xc * yc])
+    return moments, np.concatenate([(xc * xc).sum(axis=0), (yc * yc).sum(axis=0)])
+
+
+def _corr_from_sums(sums: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Корреляции из сумм моментов (... × 6P); NaN для вырожденных выборок"""
+    n, sx, sy, sxx, syy, sxy = np.split(sums, 6, axis=-1)
+    p = scale.size // 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vx, vy = sxx - sx * sx / n, syy - sy * sy / n
+        r = np.clip((sxy - sx * sy / n) / np.sqrt(vx * vy), -1.0, 1.0)
+    # постоянная колонка в реплике (все строки — копии одной): дисперсия ≈ 0
+    r[(n < 2) | (vx <= 1e-12 * scale[:p]) | (vy <= 1e-12 * scale[p:])] = np.nan
+    return r
+
+
+def _replicates(moments: np.ndarray, scale: np.ndarray, entropy: Tuple[int, ...], size: int) -> np.ndarray:
+    """Блок из `size` бутстреп-реплик корреляций (size × P)"""
+    n = len(moments)
+    rng = np.random.default_rng(np.random.SeedSequence(entropy))
+    index = rng.integers(0, n, size=(size, n))
+    index += np.arange(size)[:, None] * n  # номер строки в плоской матрице кратностей
+    weights = np.bincount(index.ravel(), minlength=size * n).reshape(size, n).astype(np.float64)
+    return _corr_from_sums(weights @ moments, scale)
+
+
+def _jackknife(moments: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Корреляции без i-й строки (n × P); NaN для строк вне пары"""
+    p = scale.size // 2
+    loo = _corr_from_sums(moments.sum(axis=0) - moments, scale)
+    loo[moments[:, :p] == 0] = np.nan
+    return loo
+
+
+# ─────────────────────────────── INTERVALS ───────────────────────────────
+
+def _quantile(ordered: np.ndarray, valid: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Квантили q (по колонке) отсортированных реплик с NaN в конце"""
+    pos = np.clip(q, 0.0, 1.0) * (valid - 1)
+    lo = np.floor(np.nan_to_num(pos)).astype(np.intp)
+    hi = np.minimum(lo + 1, np.maximum(valid - 1, 0))
+    cols = np.arange(ordered.shape[1])
+    value = ordered[lo, cols] + (pos - lo) * (ordered[hi, cols] - ordered[lo, cols])
+    return np.where((valid > 0) & np.isfinite(pos), value, np.nan)
+
+
+def _intervals(estimate: np.ndarray, reps: np.ndarray, loo: np.ndarray, level: float) -> np.ndarray:
+    """Перцентильный и BCa интервалы (K × 4) по репликам (B × K) и jackknife (n × K)"""
+    from scipy.special import ndtr, ndtri  # scipy — только при расчёте интервалов
+
+    ordered = np.sort(reps, axis=0)
+    valid = (~np.isnan(reps)).sum(axis=0)
+    alpha = (1.0 - level) / 2
+    z = ndtri(np.array([alpha, 1.0 - alpha]))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        below = ((reps < estimate).sum(axis=0) + 0.5 * (reps == estimate).sum(axis=0)) / valid
+        z0 = ndtri(np.clip(below, 1.0 / (valid + 1), valid / (valid + 1)))
+        d = np.nanmean(loo, axis=0) - loo
+        denom = 6.0 * np.nansum(d * d, axis=0) ** 1.5
+        accel = np.where(denom > 0, np.nansum(d ** 3, axis=0) / denom, 0.0)
+        bca = [ndtr(z0 + (z0 + zq) / (1.0 - accel * (z0 + zq))) for zq in z]
+
+    return np.column_stack([
+        _quantile(ordered, valid, np.full(len(valid), alpha)),
+        _quantile(ordered, valid, np.full(len(valid), 1.0 - alpha)),
+        _quantile(ordered, valid, bca[0]),
+        _quantile(ordered, valid, bca[1]),
+    ])
+
+
+def format_ci(low: float, high: float) -> str:
+    """Интервал для текста отчётов: «[-0.120; 0.750]» или «—», если он не определён"""
+    if np.isnan(low) or np.isnan(high):
+        return "—"
+    return f"[{low:.3f}; {high:.3f}]"
+
+
+# ────────────────────────────── BOOTSTRAP ────────────────────────────────
+
+def bootstrap_corr(df: pd.DataFrame, pairs: Sequence[Tuple[str, str]], by: Union[str, Iterable, None] = None,
+                   groups: Optional[Dict[Hashable, np.ndarray]] = None, overall: Optional[Hashable] = None,
+                   n_boot: int = BOOT_REPLICATES, level: float = BOOT_LEVEL, seed: int = BOOT_SEED,
+                   workers: Optional[int] = None) -> pd.DataFrame:
+    """`grouped_corr` с бутстреп-интервалами
+
+    К колонкам Group, X, Y, N, r добавляются B (число невырожденных
+    реплик), CI_low/CI_high (перцентильный интервал уровня `level`) и
+    BCa_low/BCa_high. `workers=None` — пул по числу ядер, если реплик ×
+    строк больше PARALLEL_MIN_CELLS; `workers=1` — всегда в текущем процессе.
+    """
+    result = grouped_corr(df, pairs, by, groups, overall)
+    labels, rows, codes = _group_rows(df, by, groups, overall)
+    n_pairs = len(pairs)
+    if result.empty:
+        return result.reindex(columns=list(result.columns) + CI_COLUMNS)
+
+    x = np.column_stack([df[a].to_numpy(dtype="float64", na_value=np.nan) for a, _ in pairs])
+    y = np.column_stack([df[b].to_numpy(dtype="float64", na_value=np.nan) for _, b in pairs])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+
+    # задания: (группа, блок реплик) — размер блока зависит только от числа строк группы
+    prepared, tasks = [], []
+    for g, label in enumerate(labels):
+        idx = rows[order[bounds[g]:bounds[g + 1]]]
+        moments, scale = _moments(x[idx], y[idx])
+        prepared.append((moments, scale))
+        block = max(1, min(n_boot, BLOCK_CELLS // max(len(idx), 1)))
+        key = zlib.crc32(repr(label).encode())
+        for b, start in enumerate(range(0, n_boot, block)):
+            tasks.append((g, (seed, key, b), min(block, n_boot - start)))
+
+    cells = sum(len(prepared[g][0]) * size for g, _, size in tasks)
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if cells < PARALLEL_MIN_CELLS:
+        workers = 1
+
+    with span("bootstrap", groups=len(labels), pairs=n_pairs, replicates=n_boot, workers=workers):
+        if workers == 1:
+            blocks = [_replicates(*prepared[g], entropy, size) for g, entropy, size in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = list(pool.map(_replicates, *zip(*[(*prepared[g], entropy, size)
+                                                          for g, entropy, size in tasks])))
+
+        estimate = result["r"].to_numpy().reshape(len(labels), n_pairs)
+        out = np.empty((len(labels), n_pairs, len(CI_COLUMNS)))
+        for g in range(len(labels)):
+            reps = np.vstack([blk for (t, _, _), blk in zip(tasks, blocks) if t == g])
+            out[g, :, 0] = (~np.isnan(reps)).sum(axis=0)
+            out[g, :, 1:] = _intervals(estimate[g], reps, _jackknife(*prepared[g]), level)
+
+    out[np.isnan(estimate), 1:] = np.nan
+    out = out.reshape(-1, len(CI_COLUMNS))
+    for i, column in enumerate(CI_COLUMNS):
+        result[column] = out[:, i].astype(np.int64) if column == "B" else out[:, i]
+    return result
@@ -0,0 +1,250 @@
+"""
+Контентно-адресуемый кэш артефактов конвейера.
+
+Ключ этапа — хэш кода модуля, где определена функция этапа, и всех
+модулей `function.*`, которые он импортирует (транзитивно), плюс хэш всех
+входных данных и имя профиля отрисовки. Если ключ
+совпадает с записанным в манифесте и все артефакты этапа (PNG, HTML, XLSX)
+на месте и не изменены, этап не выполняется, а его результаты берутся
+из кэша.
+"""
+
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import types
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from function.func import render_profile_name
+
+CACHE_DIR = ".cache"
+MANIFEST = "manifest.json"
+
+
+# ──────────────────────────── FINGERPRINTS ───────────────────────────────
+
+def _update(h: "hashlib._Hash", obj: Any) -> None:
+    """Рекурсивное добавление объекта в хэш (DataFrame/Series — по значениям)."""
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"DF")
+        h.update(repr(list(obj.columns)).encode())
+        h.update(repr([str(t) for t in obj.dtypes]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"S")
+        h.update(str(obj.name).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"A")
+        h.update(str(obj.dtype).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"D")
+        for k, v in obj.items():
+            _update(h, k)
+            _update(h, v)
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"L")
+        for v in obj:
+            _update(h, v)
+    else:
+        h.update(repr(obj).encode())
+
+
+def data_fingerprint(obj: Any) -> str:
+    """SHA-256 входных данных этапа."""
+    h = hashlib.sha256()
+    _update(h, obj)
+    return h.hexdigest()
+
+
+# модули общих помощников: их правка инвалидирует ключи всех этапов
+SHARED_MODULES = ("function.func", "function.correlation", "function.bootstrap", "function.permutation",
+                  "function.memo", "function.render", "function.panel")
+PACKAGE = "function"
+
+
+def _imported_modules(module: types.ModuleType) -> List[types.ModuleType]:
+    """Модули `function.*`, на которые ссылается модуль: импортированные модули и функции/классы."""
+    found = []
+    for value in vars(module).values():
+        name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+        if isinstance(name, str) and name.startswith(PACKAGE + ".") and name in sys.modules:
+            found.append(sys.modules[name])
+    return found
+
+
+def _dependencies(roots: Iterable[Optional[types.ModuleType]]) -> List[types.ModuleType]:
+    """Транзитивное замыкание импортов `function.*` (с самими корнями), по имени модуля."""
+    seen: Dict[str, types.ModuleType] = {}
+    todo = [m for m in roots if m is not None]
+    while todo:
+        module = todo.pop()
+        if module.__name__ not in seen:
+            seen[module.__name__] = module
+            todo.extend(_imported_modules(module))
+    return [seen[name] for name in sorted(seen)]
+
+
+def code_fingerprint(*funcs: Any, module: bool = True) -> str:
+    """SHA-256 исходного кода функций и всех модулей `function.*`, от которых они зависят.
+
+    Зависимости — транзитивные импорты модуля каждой функции и `SHARED_MODULES`
+    (ленивые импорты внутри функций не видны, поэтому общие помощники
+    перечислены явно). `module=True` — хэшируется и весь модуль каждой
+    функции (надёжно, но любая правка модуля инвалидирует ключ);
+    `module=False` — из него только сами функции.
+    """
+    h = hashlib.sha256()
+    own = set()
+    for func in funcs:
+        h.update(func.__qualname__.encode())
+        if not module:
+            h.update(inspect.getsource(func).encode())
+            own.add(func.__module__)
+    roots = [sys.modules.get(func.__module__) for func in funcs]
+    roots += [sys.modules.get(name) for name in SHARED_MODULES]
+    for src in _dependencies(roots):
+        if src.__name__ not in own:
+            h.update(src.__name__.encode())
+            h.update(inspect.getsource(src).encode())
+    return h.hexdigest()
+
+
+# ──────────────────────────────── CACHE ──────────────────────────────────
+
+class ArtifactCache:
+    """Манифест ключей этапов и сохранённых результатов в `<base>/.cache/`."""
+
+    def __init__(self, base: str):
+        self.base = base
+        self.root = os.path.join(base, CACHE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest_path = os.path.join(self.root, MANIFEST)
+        self._fingerprints: Dict[int, str] = {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _fingerprint(self, obj: Any) -> str:
+        # Один и тот же объект контекста (df) хэшируется один раз за запуск
+        key = id(obj)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = data_fingerprint(obj)
+        return self._fingerprints[key]
+
+    def key(self, stage: Any, args: Iterable[Any]) -> str:
+        h = hashlib.sha256()
+        h.update(stage.name.encode())
+        h.update(code_fingerprint(stage.func).encode())
+        h.update(render_profile_name().encode())
+        for arg in args:
+            h.update(self._fingerprint(arg).encode())
+        return h.hexdigest()
+
+    def _artifact_files(self, patterns: Iterable[str]) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Размер и mtime всех файлов артефактов; None, если какого-то нет."""
+        files = {}
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.join(self.base, pattern)))
+            if not matches:
+                return None
+            for path in matches:
+                st = os.stat(path)
+                files[os.path.relpath(path, self.base)] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    def _result_path(self, stage_name: str) -> str:
+        return os.path.join(self.root, f"{stage_name}.pkl")
+
+    def lookup(self, stage: Any, key: str) -> Tuple[bool, Any]:
+        """(True, результат) при попадании в кэш, иначе (False, None)."""
+        entry = self.manifest.get(stage.name)
+        if not entry or entry.get("key") != key:
+            return False, None
+        files = self._artifact_files(stage.artifacts)
+        if files is None or {k: list(v) for k, v in files.items()} != entry.get("files"):
+            return False, None
+        try:
+            with open(self._result_path(stage.name), "rb") as f:
+                return True, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+    def store(self, stage: Any, key: str, result: Any) -> None:
+        files = self._artifact_files(stage.artifacts)
+        if files is None:
+            return
+        with open(self._result_path(stage.name), "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.manifest[stage.name] = {
+            "key": key,
+            "files": {k: list(v) for k, v in files.items()},
+        }
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+
+# ───────────────────────── PER-COUNTRY REBUILD ───────────────────────────
+
+COUNTRY_STATE = "countries.json"
+COUNTRY_ARTIFACTS = ("{c}_analysis.html", "{c}_crypto_trend.png", "{c}_correlation.png", "{c}_economics.png")
+
+
+def country_fingerprints(df: pd.DataFrame, countries: Dict[str, Any]) -> Dict[str, str]:
+    """Хэш строк панели (без индекса) и статических атрибутов каждой страны."""
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    schema = repr([(c, str(t)) for c, t in df.dtypes.items()]).encode()
+    result = {}
+    for code, idx in df.groupby("Country", sort=False, observed=True).indices.items():
+        h = hashlib.sha256(schema)
+        h.update(row_hash[idx].tobytes())
+        h.update(data_fingerprint(countries.get(code)).encode())
+        result[code] = h.hexdigest()
+    return result
+
+
+def changed_countries(df: pd.DataFrame, countries: Dict[str, Any], base: str, *funcs: Any) -> List[str]:
+    """Страны, чьи строки изменились с прошлого запуска или чьих файлов нет.
+
+    При изменении кода `funcs` (генератора страниц) пересобираются все страны.
+    """
+    try:
+        with open(os.path.join(base, CACHE_DIR, COUNTRY_STATE), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    if state.get("code") != code_fingerprint(*funcs, module=False) or state.get("profile") != render_profile_name():
+        return list(countries)
+
+    previous = state.get("countries", {})
+    current = country_fingerprints(df, countries)
+    changed = []
+    for code in countries:
+        folder = os.path.join(base, "strany_analiz", code.lower())
+        files_ok = all(os.path.exists(os.path.join(folder, p.format(c=code.lower()))) for p in COUNTRY_ARTIFACTS)
+        if not files_ok or previous.get(code) != current.get(code):
+            changed.append(code)
+    return changed
+
+
+def remember_countries(df: pd.DataFrame, countries: Dict[str, Any], base: str, *funcs: Any) -> None:
+    """Запись отпечатков стран после успешной пересборки."""
+    root = os.path.join(base, CACHE_DIR)
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, COUNTRY_STATE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"code": code_fingerprint(*funcs, module=False), "profile": render_profile_name(),
+                   "countries": country_fingerprints(df, countries)}, f, indent=1)
+    os.replace(path + ".tmp", path)
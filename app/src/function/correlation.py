@@ -0,0 +1,187 @@
+"""
+Корреляции Пирсона по группам за один проход.
+
+Для всех пар колонок и всех групп (страны, периоды, группы стран, вся
+панель) за раз считаются групповые суммы — число наблюдений, средние,
+центрированные суммы квадратов и перекрёстных произведений — через
+`np.bincount` по плоскому индексу «группа × пара». Время растёт как один
+проход по данным, а не как пары × группы × полные сканирования панели.
+
+Пропуски исключаются попарно, как в `Series.corr`: r = NaN, если
+наблюдений меньше двух или одна из колонок в группе постоянна.
+Результат — длинная таблица Group, X, Y, N, r. Значения группы «вся
+панель» записываются в кэш запуска (`function.memo`), и `memo.corr` на
+той же панели их не пересчитывает.
+
+`rolling_corr` — скользящие корреляции внутри групп: те же суммы
+считаются накопленно (`cumsum`), и сумма по окну — разность двух
+накопленных сумм, O(n) на все окна вместо пересчёта каждого окна.
+"""
+
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from function import memo
+from function.tracing import span
+
+CORR_COLUMNS = ["Group", "X", "Y", "N", "r"]
+VARIANCE_TOLERANCE = 1e-10  # центрированная сумма квадратов меньше этой доли Σx² группы — ряд постоянен
+
+
+def _degenerate(count: np.ndarray, sxx: np.ndarray, syy: np.ndarray,
+                ref_x: np.ndarray, ref_y: np.ndarray) -> np.ndarray:
+    """Где r не определён: меньше двух наблюдений или постоянная колонка
+
+    sxx/syy — центрированные суммы квадратов (группы или окна), ref_x/ref_y —
+    Σx², Σy² исходных значений группы. После центрирования у постоянной
+    колонки остаётся не 0, а ошибка округления — поэтому порог
+    относительный, одинаковый для `grouped_corr` и `rolling_corr`.
+    """
+    return (count < 2) | (sxx <= VARIANCE_TOLERANCE * ref_x) | (syy <= VARIANCE_TOLERANCE * ref_y)
+
+
+def _group_rows(df: pd.DataFrame, by=None, groups: Optional[Dict[Hashable, np.ndarray]] = None,
+                overall: Optional[Hashable] = None) -> Tuple[list, np.ndarray, np.ndarray]:
+    """(метки групп, номера строк, код группы каждой строки)
+
+    Строка может входить в несколько групп (периоды, вся панель) — тогда
+    она повторяется с разными кодами.
+    """
+    labels: list = []
+    rows, codes = [], []
+    n = len(df)
+    if overall is not None:
+        labels.append(overall)
+        rows.append(np.arange(n))
+        codes.append(np.zeros(n, dtype=np.intp))
+    if by is not None:
+        keys = df[by] if isinstance(by, str) else pd.Series(np.asarray(by, dtype=object), index=df.index)
+        factor, uniques = pd.factorize(keys, sort=False)
+        present = factor >= 0  # NaN/None — строка вне групп
+        rows.append(np.flatnonzero(present))
+        codes.append(factor[present].astype(np.intp) + len(labels))
+        labels.extend(uniques)
+    for label, selector in (groups or {}).items():
+        selector = np.asarray(selector)
+        idx = np.flatnonzero(selector) if selector.dtype == bool else selector.astype(np.intp)
+        if len(idx):
+            rows.append(idx)
+            codes.append(np.full(len(idx), len(labels), dtype=np.intp))
+            labels.append(label)
+    if not rows:
+        return [], np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    return labels, np.concatenate(rows), np.concatenate(codes)
+
+
+def grouped_corr(df: pd.DataFrame, pairs: Sequence[Tuple[str, str]], by: Union[str, Iterable, None] = None,
+                 groups: Optional[Dict[Hashable, np.ndarray]] = None,
+                 overall: Optional[Hashable] = None) -> pd.DataFrame:
+    """Корреляции всех пар `pairs` во всех группах
+
+    by — колонка или массив меток групп по строкам (непересекающиеся группы,
+    NaN — строка вне групп); groups — {метка: булева маска или номера строк}
+    для пересекающихся групп; overall — метка группы «вся панель».
+    Порядок строк результата: группы (overall, by, groups) × пары.
+    """
+    labels, rows, codes = _group_rows(df, by, groups, overall)
+    n_groups, n_pairs = len(labels), len(pairs)
+    if not n_groups or not n_pairs:
+        return pd.DataFrame(columns=CORR_COLUMNS)
+
+    with span("grouped_corr", rows=len(rows), groups=n_groups, pairs=n_pairs):
+        x = np.column_stack([df[a].to_numpy(dtype="float64", na_value=np.nan) for a, _ in pairs])[rows]
+        y = np.column_stack([df[b].to_numpy(dtype="float64", na_value=np.nan) for _, b in pairs])[rows]
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+        flat = (codes[:, None] * n_pairs + np.arange(n_pairs)).ravel()
+
+        def group_sum(values: np.ndarray) -> np.ndarray:
+            return np.bincount(flat, weights=values.ravel(), minlength=n_groups * n_pairs).reshape(n_groups, n_pairs)
+
+        count = group_sum(valid.astype(np.float64))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x, mean_y = group_sum(x) / count, group_sum(y) / count
+            # центрирование групповыми средними — без потери точности на больших уровнях
+            dx = np.where(valid, x - mean_x[codes], 0.0)
+            dy = np.where(valid, y - mean_y[codes], 0.0)
+            sxx, syy, sxy = group_sum(dx * dx), group_sum(dy * dy), group_sum(dx * dy)
+            r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        r[_degenerate(count, sxx, syy, group_sum(x * x), group_sum(y * y))] = np.nan
+
+    if overall is not None:  # корреляции по всей панели — в кэш запуска (`memo.corr`)
+        for (a, b), value in zip(pairs, r[0]):
+            memo.remember("corr", df, sorted((a, b)), value)
+
+    return pd.DataFrame({
+        "Group": np.repeat(np.asarray(labels, dtype=object), n_pairs),
+        "X": np.tile([a for a, _ in pairs], n_groups),
+        "Y": np.tile([b for _, b in pairs], n_groups),
+        "N": count.ravel().astype(np.int64),
+        "r": r.ravel(),
+    })
+
+
+def rolling_corr(df: pd.DataFrame, pairs: Sequence[Tuple[str, str]], window: int, by: str = "Country",
+                 order: Union[str, Sequence[str]] = "Year", min_periods: Optional[int] = None) -> pd.DataFrame:
+    """Скользящие корреляции пар `pairs` по окну из `window` строк внутри групп `by`
+
+    Строки группы упорядочиваются по колонке (колонкам) `order`; значение
+    относится к последней строке окна. Окна, где наблюдений без пропусков
+    меньше `min_periods` (по умолчанию — `window`), дают NaN, как
+    `rolling().corr()`. Результат — Group, X, Y, `order`, N, r: группы ×
+    строки × пары; строки без ключа группы (NaN/None) не входят ни в
+    одно окно, как в `grouped_corr`.
+    """
+    order = [order] if isinstance(order, str) else list(order)
+    min_periods = window if min_periods is None else min_periods
+    columns = ["Group", "X", "Y", *order, "N", "r"]
+    n_pairs = len(pairs)
+    if not len(df) or not n_pairs:
+        return pd.DataFrame(columns=columns)
+
+    codes, labels = pd.factorize(df[by], sort=False)
+    keep = np.flatnonzero(codes >= 0)  # -1 — строка вне групп
+    if not len(keep):
+        return pd.DataFrame(columns=columns)
+
+    with span("rolling_corr", rows=len(keep), pairs=n_pairs, window=window):
+        sort = keep[np.lexsort([df[c].to_numpy()[keep] for c in reversed(order)] + [codes[keep]])]
+        codes = codes[sort]
+        x = np.column_stack([df[a].to_numpy(dtype="float64", na_value=np.nan) for a, _ in pairs])[sort]
+        y = np.column_stack([df[b].to_numpy(dtype="float64", na_value=np.nan) for _, b in pairs])[sort]
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+
+        # центрирование средними группы: накопленные суммы не теряют точность
+        n_groups = len(labels)
+        count = np.stack([np.bincount(codes, valid[:, p], n_groups) for p in range(n_pairs)], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x = np.stack([np.bincount(codes, x[:, p], n_groups) for p in range(n_pairs)], axis=1) / count
+            mean_y = np.stack([np.bincount(codes, y[:, p], n_groups) for p in range(n_pairs)], axis=1) / count
+        dx = np.where(valid, x - np.nan_to_num(mean_x)[codes], 0.0)
+        dy = np.where(valid, y - np.nan_to_num(mean_y)[codes], 0.0)
+
+        moments = np.hstack([valid.astype(np.float64), dx, dy, dx * dx, dy * dy, dx * dy])
+        cumulative = np.vstack([np.zeros((1, moments.shape[1])), np.cumsum(moments, axis=0)])
+        pos = np.arange(len(codes))
+        group_start = np.searchsorted(codes, codes, side="left")
+        sums = cumulative[pos + 1] - cumulative[np.maximum(pos - window + 1, group_start)]
+        ref_x = np.stack([np.bincount(codes, x[:, p] ** 2, n_groups) for p in range(n_pairs)], axis=1)[codes]
+        ref_y = np.stack([np.bincount(codes, y[:, p] ** 2, n_groups) for p in range(n_pairs)], axis=1)[codes]
+
+        n, sx, sy, sxx, syy, sxy = np.split(sums, 6, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vx, vy = sxx - sx * sx / n, syy - sy * sy / n
+            r = np.clip((sxy - sx * sy / n) / np.sqrt(vx * vy), -1.0, 1.0)
+        r[(n < min_periods) | _degenerate(n, vx, vy, ref_x, ref_y)] = np.nan
+
+    return pd.DataFrame({
+        "Group": np.repeat(np.asarray(labels, dtype=object)[codes], n_pairs),
+        "X": np.tile([a for a, _ in pairs], len(codes)),
+        "Y": np.tile([b for _, b in pairs], len(codes)),
+        **{c: np.repeat(df[c].to_numpy()[sort], n_pairs) for c in order},
+        "N": n.ravel().astype(np.int64),
+        "r": r.ravel(),
+    })
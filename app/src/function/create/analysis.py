@@ -1,18 +1,17 @@
 
 import os
-import datetime as _dt
 import warnings
-from typing import Tuple, Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
+from typing import Dict, Any, Optional
+
 import numpy as np
 import pandas as pd
-from scipy import stats
-import argparse
 
-from function.func import *
+from function.func import optimize_int_columns, country_colors, pyplot, apply_layout, save_figure, save_plotly
+from function import memo
+from function.bootstrap import bootstrap_corr, format_ci
+from function.correlation import grouped_corr, rolling_corr
+from function.permutation import PERM_COLUMNS, permutation_corr
+from function.tracing import span
 
 warnings.filterwarnings("ignore")
 
@@ -23,40 +22,38 @@ warnings.filterwarnings("ignore")
 
 def comprehensive_analysis(df: pd.DataFrame, countries: Dict[str, Any], base: str):
     print("📊 Создание полного анализа…")
-    df = optimize_int_columns(df)
+    plt = pyplot()
 
     # — Корреляции
-    num_cols = [c for c in df.columns if df[c].dtype != "object" and c not in ("Year",)]
+    num_cols = [c for c in df.select_dtypes("number").columns if c not in ("Year",)]
     corr_matrix = df[num_cols].corr()
 
-    country_corr = {}
-    for c in df["Country"].unique():
-        country_data = df[df["Country"] == c]
-        country_name = countries[c]["name_ru"]
-        corr = country_data["Inflation"].corr(country_data["Crypto_Adoption"])
-        country_corr[country_name] = round(corr, 3)
-
+    # Инфляция vs криптоадопция: вся панель, страны и периоды — одним проходом,
+    # с бутстреп-интервалами и перестановочными p-значениями
+    years = df["Year"].to_numpy()
     periods = {
-        "До кризиса (2010-2019)": df[df["Year"] <= 2019],
-        "Пандемия (2020-2021)": df[df["Year"].between(2020, 2021)],
-        "Кризис (2022-2023)": df[df["Year"].between(2022, 2023)],
-        "Восстановление (2024-2025)": df[df["Year"] >= 2024],
+        "До кризиса (2010-2019)": years <= 2019,
+        "Пандемия (2020-2021)": (years >= 2020) & (years <= 2021),
+        "Кризис (2022-2023)": (years >= 2022) & (years <= 2023),
+        "Восстановление (2024-2025)": years >= 2024,
     }
-    period_corr = {}
-    for k, v in periods.items():
-        if len(v) > 0:
-            corr = v["Inflation"].corr(v["Crypto_Adoption"])
-            period_corr[k] = round(corr, 3)
+    boot = bootstrap_corr(df, [("Inflation", "Crypto_Adoption")], by="Country", groups=periods, overall="Все")
+    boot[PERM_COLUMNS] = permutation_corr(df, [("Inflation", "Crypto_Adoption")], by="Country", groups=periods,
+                                          overall="Все")[PERM_COLUMNS]
+    inflation_corr = boot.set_index("Group")["r"]
+    country_corr = {countries[c]["name_ru"]: round(inflation_corr[c], 3) for c in df["Country"].unique()}
+    period_corr = {k: round(inflation_corr[k], 3) for k in periods if k in inflation_corr.index}
+    corr_ci = confidence_table(boot, {c: countries[c]["name_ru"] for c in df["Country"].unique()})
 
     # — Графики
     print("🎨 Создание графиков...")
-    colors = {'Ukraine': 'red', 'Poland': 'orange', 'Czech': 'blue', 
-              'Sweden': 'green', 'Norway': 'purple', 'Belarus': 'gray'}
+    colors = country_colors(countries, {'Ukraine': 'red', 'Poland': 'orange', 'Czech': 'blue', 
+                                           'Sweden': 'green', 'Norway': 'purple', 'Belarus': 'gray'})
     
     # График 1: Динамика криптоадопции
     plt.figure(figsize=(16, 10))
     for country in df['Country'].unique():
-        country_data = df[df['Country'] == country]
+        country_data = df.panel.country(country)
         country_name = countries[country]['name_ru']
         plt.plot(country_data['Year'], country_data['Crypto_Adoption'], 
                 marker='o', linewidth=3, label=country_name, color=colors[country])
@@ -73,14 +70,14 @@ def comprehensive_analysis(df: pd.DataFrame, countries: Dict[str, Any], base: st
     plt.ylabel('Процент владельцев криптовалют (%)', fontsize=12)
     plt.legend(fontsize=12)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(base, 'grafiki', '01_dinamika_kripto_2010_2025.png'), dpi=300, bbox_inches='tight')
+    apply_layout()
+    save_figure(os.path.join(base, 'grafiki', '01_dinamika_kripto_2010_2025.png'))
     plt.close()
     
     # График 2: Корреляция
     plt.figure(figsize=(12, 8))
     for country in df['Country'].unique():
-        country_data = df[df['Country'] == country]
+        country_data = df.panel.country(country)
         country_name = countries[country]['name_ru']
         sizes = country_data['Currency_Volatility'] * 5
         plt.scatter(country_data['Inflation'], country_data['Crypto_Adoption'], 
@@ -90,7 +87,7 @@ def comprehensive_analysis(df: pd.DataFrame, countries: Dict[str, Any], base: st
     p = np.poly1d(z)
     plt.plot(df['Inflation'], p(df['Inflation']), "r--", alpha=0.8, linewidth=2)
     
-    correlation = df['Inflation'].corr(df['Crypto_Adoption'])
+    correlation = inflation_corr["Все"]
     plt.text(0.05, 0.95, f'Общая корреляция: {correlation:.3f}', 
              transform=plt.gca().transAxes, fontsize=14, fontweight='bold',
              bbox=dict(boxstyle="round", facecolor='yellow', alpha=0.8))
@@ -100,38 +97,48 @@ def comprehensive_analysis(df: pd.DataFrame, countries: Dict[str, Any], base: st
     plt.ylabel('Криптоадопция (%)', fontsize=12)
     plt.legend(fontsize=10)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(base, 'grafiki', '02_inflation_vs_crypto.png'), dpi=300, bbox_inches='tight')
+    apply_layout()
+    save_figure(os.path.join(base, 'grafiki', '02_inflation_vs_crypto.png'))
     plt.close()
     
     print("✅ Графики созданы!")
 
-    return corr_matrix, country_corr, period_corr
+    return corr_matrix, country_corr, period_corr, corr_ci
+
+def confidence_table(boot: pd.DataFrame, names: Dict[str, str]) -> pd.DataFrame:
+    """Таблица для листов и страниц: группа (коды стран → названия), 95% ДИ и перестановочное p"""
+    return pd.DataFrame({
+        "Группа": [names.get(g, g) for g in boot["Group"]],
+        "N": boot["N"].to_numpy(),
+        "ДИ_перцентильный_низ": boot["CI_low"].round(3).to_numpy(),
+        "ДИ_перцентильный_верх": boot["CI_high"].round(3).to_numpy(),
+        "ДИ_BCa_низ": boot["BCa_low"].round(3).to_numpy(),
+        "ДИ_BCa_верх": boot["BCa_high"].round(3).to_numpy(),
+        "p_перестановочный": boot["p_value"].round(4).to_numpy(),
+    })
+
 def trust_btc_analysis(df, countries, base):
     """Анализ корреляции между доверием к государству и адопцией BTC"""
     print("🔍 Анализ zaufanie vs adopcja BTC...")
+    import plotly.graph_objects as go
     
-    # Корреляции по странам
-    trust_correlations = {}
-    for country_code, country_info in countries.items():
-        country_data = df[df['Country'] == country_code]
-        country_name = country_info['name_ru']
-        
-        # Корреляция доверия и BTC (отрицательная = чем меньше доверия, тем больше BTC)
-        trust_btc_corr = country_data['Government_Trust'].corr(country_data['Crypto_Adoption'])
-        trust_correlations[country_name] = round(trust_btc_corr, 3)
-    
-    # Общая корреляция
-    overall_trust_corr = df['Government_Trust'].corr(df['Crypto_Adoption'])
+    # Корреляция доверия и BTC по странам и общая (отрицательная = чем меньше доверия, тем больше BTC)
+    trust_boot = bootstrap_corr(df, [('Government_Trust', 'Crypto_Adoption')], by='Country', overall='Все')
+    trust_boot[PERM_COLUMNS] = permutation_corr(df, [('Government_Trust', 'Crypto_Adoption')], by='Country',
+                                                overall='Все')[PERM_COLUMNS]
+    trust_boot = trust_boot.set_index('Group')
+    trust_corr = trust_boot['r']
+    trust_correlations = {info['name_ru']: round(trust_corr.get(code, np.nan), 3) for code, info in countries.items()}
+    overall_trust_corr = trust_corr['Все']
     
     # Создаем график корреляции доверие vs BTC
     fig_trust = go.Figure()
     
-    colors = {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
-              'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'}
+    colors = country_colors(countries, {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
+                                           'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'})
     
     for country_code, country_info in countries.items():
-        country_data = df[df['Country'] == country_code]
+        country_data = df.panel.country(country_code)
         country_name = country_info['name_ru']
         
         fig_trust.add_trace(go.Scatter(
@@ -145,6 +152,8 @@ def trust_btc_analysis(df, countries, base):
                 opacity=0.7
             ),
             hovertemplate=f'<b>{country_name}</b><br>' +
+                         f'Korelacja: {trust_correlations[country_name]} '
+                         f'(95% CI BCa: {format_ci(*trust_boot.loc[country_code, ["BCa_low", "BCa_high"]])})<br>' +
                          'Zaufanie do państwa: %{x:.0f}%<br>' +
                          'Adopcja BTC: %{y:.1f}%<br>' +
                          'Rok: %{customdata}<br>' +
@@ -153,8 +162,7 @@ def trust_btc_analysis(df, countries, base):
         ))
     
     # Линия тренда
-    from scipy import stats
-    slope, intercept, r_value, p_value, std_err = stats.linregress(df['Government_Trust'], df['Crypto_Adoption'])
+    slope, intercept, r_value, p_value, std_err = memo.linregress(df, 'Government_Trust', 'Crypto_Adoption')
     line_x = [df['Government_Trust'].min(), df['Government_Trust'].max()]
     line_y = [slope * x + intercept for x in line_x]
     
@@ -177,21 +185,30 @@ def trust_btc_analysis(df, countries, base):
     
     # Сохранение
     grafiki_path = os.path.join(base, 'grafiki')
-    fig_trust.write_html(os.path.join(grafiki_path, 'trust_vs_btc.html'))
+    save_plotly(fig_trust, os.path.join(grafiki_path, 'trust_vs_btc.html'))
     
     # Сохранение результатов в Excel
     trust_analysis_path = os.path.join(base, 'otchety', 'trust_btc_analysis.xlsx')
-    with pd.ExcelWriter(trust_analysis_path, engine='openpyxl') as writer:
+    with span('excel', path=trust_analysis_path), pd.ExcelWriter(trust_analysis_path, engine='openpyxl') as writer:
         # Корреляции по странам
         trust_df = pd.DataFrame(list(trust_correlations.items()), 
                                columns=['Kraj', 'Korelacja_Zaufanie_BTC'])
+        ci = trust_boot.reindex(list(countries))
+        trust_df['N'] = ci['N'].to_numpy()
+        trust_df['CI95_percentyl_dolny'] = ci['CI_low'].round(3).to_numpy()
+        trust_df['CI95_percentyl_górny'] = ci['CI_high'].round(3).to_numpy()
+        trust_df['CI95_BCa_dolny'] = ci['BCa_low'].round(3).to_numpy()
+        trust_df['CI95_BCa_górny'] = ci['BCa_high'].round(3).to_numpy()
+        trust_df['p_permutacyjne'] = ci['p_value'].round(4).to_numpy()
         trust_df = trust_df.sort_values('Korelacja_Zaufanie_BTC')
         trust_df.to_excel(writer, sheet_name='Korelacje_Zaufanie_BTC', index=False)
         
         # Общие статистики
         stats_df = pd.DataFrame({
-            'Wskaźnik': ['Ogólna korelacja zaufanie-BTC', 'R-squared', 'P-value'],
-            'Wartość': [overall_trust_corr, r_value**2, p_value]
+            'Wskaźnik': ['Ogólna korelacja zaufanie-BTC', 'CI95 BCa dolny', 'CI95 BCa górny',
+                         'P-value permutacyjne', 'R-squared', 'P-value'],
+            'Wartość': [overall_trust_corr, trust_boot.at['Все', 'BCa_low'], trust_boot.at['Все', 'BCa_high'],
+                        trust_boot.at['Все', 'p_value'], r_value**2, p_value]
         })
         stats_df.to_excel(writer, sheet_name='Statystyki_Ogólne', index=False)
     
@@ -200,3 +217,124 @@ def trust_btc_analysis(df, countries, base):
     print(f"   📈 R-squared: {r_value**2:.3f}")
     
     return trust_correlations, overall_trust_corr, fig_trust
+
+ROLLING_WINDOW = 5
+ROLLING_PAIRS = {
+    'Inflacja – adopcja BTC': ('Inflation', 'Crypto_Adoption'),
+    'Zaufanie – adopcja BTC': ('Government_Trust', 'Crypto_Adoption'),
+}
+
+def rolling_correlation_analysis(df: pd.DataFrame, countries: Dict[str, Any], window: int, base: str):
+    """Скользящие корреляции (окно `window` лет) по странам и интерактивный график
+
+    Показывает, как связь инфляции и доверия с криптоадопцией меняется
+    вокруг 2014, 2020 и 2022 годов, а не только по четырём периодам.
+    В месячной панели окно — `window` × 12 месяцев.
+    """
+    print(f"📈 Скользящие корреляции (окно: {window} г.)...")
+    import plotly.graph_objects as go
+
+    monthly = 'Month' in df.columns
+    rows = window * (12 if monthly else 1)
+    rolling = rolling_corr(df, list(ROLLING_PAIRS.values()), rows, by='Country',
+                           order=['Year', 'Month'] if monthly else 'Year')
+    # подпись окна: период первой строки окна (на rows - 1 строк раньше в той же стране) – период последней
+    period = rolling['Year'].astype(str)
+    if monthly:
+        period = period + '-' + rolling['Month'].map('{:02d}'.format)
+    rolling['Window'] = period.groupby([rolling['Group'], rolling['X']]).shift(rows - 1) + '–' + period
+    if monthly:  # точка графика — конец окна в долях года
+        rolling['Year'] = rolling['Year'] + (rolling['Month'] - 1) / 12
+    rolling['Pair'] = rolling['X'].map({x: name for name, (x, _) in ROLLING_PAIRS.items()})
+
+    colors = country_colors(countries, {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1',
+                                           'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'})
+    fig_rolling = go.Figure()
+    for i, pair_name in enumerate(ROLLING_PAIRS):
+        for country_code, country_info in countries.items():
+            series = rolling[(rolling['Pair'] == pair_name) & (rolling['Group'] == country_code)]
+            country_name = country_info['name_ru']
+            fig_rolling.add_trace(go.Scatter(
+                x=series['Year'],
+                y=series['r'],
+                mode='lines+markers',
+                name=country_name,
+                visible=i == 0,
+                line=dict(color=colors[country_code], width=3),
+                hovertemplate=f'<b>{country_name}</b><br>' +
+                             'Okno: %{customdata}<br>' +
+                             'r: %{y:.3f}<br>' +
+                             '<extra></extra>',
+                customdata=series['Window']
+            ))
+
+    # Переключатель пар: видимы только линии выбранной пары
+    n_countries = len(countries)
+    buttons = [dict(label=pair_name, method='update',
+                    args=[{'visible': [j // n_countries == i for j in range(len(fig_rolling.data))]},
+                          {'title': f'Korelacja krocząca (okno: {window}): {pair_name}'}])
+               for i, pair_name in enumerate(ROLLING_PAIRS)]
+
+    fig_rolling.add_hline(y=0, line_color='gray', line_width=1)
+    fig_rolling.add_vline(x=2014, line_dash="dash", line_color="gray",
+                          annotation_text="Majdan na Ukrainie", annotation_position="top")
+    fig_rolling.add_vline(x=2020, line_dash="dash", line_color="orange",
+                          annotation_text="COVID-19", annotation_position="top")
+    fig_rolling.add_vline(x=2022, line_dash="dash", line_color="red",
+                          annotation_text="Wojna na Ukrainie", annotation_position="top")
+
+    fig_rolling.update_layout(
+        title=f'Korelacja krocząca (okno: {window}): {next(iter(ROLLING_PAIRS))}',
+        xaxis_title='Rok (koniec okna)',
+        yaxis_title='Korelacja Pearsona r',
+        yaxis=dict(range=[-1.05, 1.05]),
+        updatemenus=[dict(buttons=buttons, direction='down', x=1.0, xanchor='right', y=1.15, yanchor='top')],
+        hovermode='x unified',
+        template='plotly_white',
+        width=1200,
+        height=600
+    )
+
+    save_plotly(fig_rolling, os.path.join(base, 'grafiki', 'rolling_correlations.html'))
+
+    print("✅ График скользящих корреляций создан!")
+    return rolling, fig_rolling
+
+def btc_market_analysis(df: pd.DataFrame, countries: Dict[str, Any], base: str, out: Optional[str] = None):
+    """Рыночные признаки BTC (доходность, волатильность, просадка, объём) vs криптоадопция
+
+    OHLCV из app/data/rynok/*.csv агрегируется до сетки панели (годы или
+    месяцы, если в панели есть Month); без файлов этап пропускается.
+    Отчёт пишется в `out` (None — в base).
+    """
+    from function import market
+
+    out = out or base
+    symbols = market.ingest_all(base)
+    if not symbols:
+        print(f"⚠️ Нет OHLCV файлов в {market.MARKET_DIR}/ — рыночный анализ пропущен")
+        return None
+    print("💹 Анализ рыночных данных BTC...")
+    freq = "M" if "Month" in df.columns else "Y"
+    features = market.resample_ohlcv(next(iter(symbols.values())), freq)
+    volumes = market.local_volume(features, base, {info['currency'] for info in countries.values()})
+    panel = market.market_panel(df, features, volumes)
+
+    # Корреляции признаков с криптоадопцией: по всем строкам и по странам
+    feature_cols = [c for c in ('BTC_Return_%', 'BTC_Realized_Vol_%', 'BTC_Max_Drawdown_%',
+                                'BTC_Volume_USD', 'BTC_Volume_Local') if c in panel.columns]
+    corr = grouped_corr(panel, [(c, 'Crypto_Adoption') for c in feature_cols], by='Country', overall='Все страны')
+    corr['Страна'] = [g if g == 'Все страны' else countries[g]['name_ru'] for g in corr['Group']]
+    corr_df = (corr.pivot(index='Страна', columns='X', values='r').round(3)
+               .reindex(index=corr['Страна'].unique(), columns=feature_cols).reset_index())
+    corr_df.columns.name = None
+
+    market_path = os.path.join(out, 'otchety', 'btc_market_analysis.xlsx')
+    with span('excel', path=market_path), pd.ExcelWriter(market_path, engine='openpyxl') as writer:
+        optimize_int_columns(features.copy()).to_excel(writer, sheet_name='Priznaki_BTC', index=False)
+        corr_df.to_excel(writer, sheet_name='Korrelyacii_s_adopciej', index=False)
+        if len(volumes):
+            optimize_int_columns(volumes.copy()).to_excel(writer, sheet_name='Obyom_v_valyutah', index=False)
+
+    print(f"✅ Рыночный анализ сохранён: {market_path}")
+    return corr_df
@@ -1,18 +1,15 @@
 
 import os
-import datetime as _dt
 import warnings
-from typing import Tuple, Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import numpy as np
+from typing import Dict, Any
+
 import pandas as pd
-from scipy import stats
-import argparse
 
-from function.func import *
+from function.func import optimize_int_columns, expand_panel, country_colors, pyplot, apply_layout, save_figure, plotly_bundle, PLOTLY_BUNDLE
+from function import memo
+from function.bootstrap import BOOT_REPLICATES, format_ci
+from function.permutation import PERM_PERMUTATIONS
+from function.tracing import span
 
 warnings.filterwarnings("ignore")
 
@@ -20,35 +17,38 @@ warnings.filterwarnings("ignore")
 # ────────────────────────────── REPORTS ─────────────────────────────────
 
 def excel_reports(df: pd.DataFrame, countries: Dict[str, Any], corr_m: pd.DataFrame,
-                         country_corr: Dict[str, float], period_corr: Dict[str, float], base: str):
+                         country_corr: Dict[str, float], period_corr: Dict[str, float], corr_ci: pd.DataFrame,
+                         base: str):
     print("📋 Создание Excel отчётов…")
-    df = optimize_int_columns(df)
     path = os.path.join(base, "otchety", "full_crypto_analysis_2010_2025.xlsx")
 
-    with pd.ExcelWriter(path, engine="openpyxl") as w:
-        df.to_excel(w, sheet_name="Vse_dannye_2010_2025", index=False)
+    with span('excel', path=path), pd.ExcelWriter(path, engine="openpyxl") as w:
+        expand_panel(df).to_excel(w, sheet_name="Vse_dannye_2010_2025", index=False)
         corr_m.to_excel(w, sheet_name="Korrelyacii_polnye")
 
+        # Корреляции с 95% бутстреп-интервалами (перцентильный и BCa)
+        ci = corr_ci.set_index("Группа")
         cc_df = optimize_int_columns(pd.DataFrame(list(country_corr.items()), columns=["Страна", "Корреляция"]))
-        cc_df.to_excel(w, sheet_name="Korrelyacii_po_stranam", index=False)
+        cc_df.join(ci, on="Страна").to_excel(w, sheet_name="Korrelyacii_po_stranam", index=False)
 
         pc_df = optimize_int_columns(pd.DataFrame(list(period_corr.items()), columns=["Период", "Корреляция"]))
-        pc_df.to_excel(w, sheet_name="Korrelyacii_po_periodam", index=False)
+        pc_df.join(ci, on="Период").to_excel(w, sheet_name="Korrelyacii_po_periodam", index=False)
 
         # Статистика по странам
+        first, last = df.panel.year_range()
         stats = []
         for code, info in countries.items():
-            c_dat = df[df["Country"] == code]
+            c_dat = df.panel.country(code)
             stats.append({
                 "Страна": info["name_ru"],
                 "Валюта": info["currency"],
                 "Население_млн": info["population"],
                 "Тип_стратегии": info["strategy_type"],
-                "Средняя_криптоадопция_%": round(c_dat["Crypto_Adoption"].mean(), 2),
-                "Макс_криптоадопция_%": round(c_dat["Crypto_Adoption"].max(), 2),
+                "Средняя_криптоадопция_%": round(float(c_dat["Crypto_Adoption"].mean()), 2),
+                "Макс_криптоадопция_%": round(float(c_dat["Crypto_Adoption"].max()), 2),
                 "Год_максимума": int(c_dat.loc[c_dat["Crypto_Adoption"].idxmax(), "Year"]),
-                "Рост_с_2010_%": round(((c_dat["Crypto_Adoption"].iloc[-1] / c_dat["Crypto_Adoption"].iloc[0]) - 1) * 100, 1),
-                "ВВП_на_душу_2025": int(c_dat[c_dat["Year"] == 2025]["GDP_Per_Capita"].iloc[0]),
+                f"Рост_с_{first}_%": round(float((c_dat["Crypto_Adoption"].iloc[-1] / c_dat["Crypto_Adoption"].iloc[0]) - 1) * 100, 1),
+                f"ВВП_на_душу_{last}": int(c_dat["GDP_Per_Capita"].iloc[-1]),
                 "Основные_криптовалюты": ", ".join(info["main_crypto"]),
                 "Драйверы_адопции": info["crypto_drivers"]
             })
@@ -81,7 +81,8 @@ def full_methodology_document(base: str):
     
     rezultaty_path = os.path.join(base, 'rezultaty')
     
-    with open(os.path.join(rezultaty_path, 'polnaya_metodologiya_i_formuly.txt'), 'w', encoding='utf-8') as f:
+    txt_path = os.path.join(rezultaty_path, 'polnaya_metodologiya_i_formuly.txt')
+    with span('write', path=txt_path), open(txt_path, 'w', encoding='utf-8') as f:
         f.write("ПОЛНАЯ МЕТОДОЛОГИЯ ИССЛЕДОВАНИЯ КРИПТОАДОПЦИИ\n")
         f.write("АНАЛИЗ СВЯЗИ МЕЖДУ ИНФЛЯЦИЕЙ И КРИПТОВАЛЮТНЫМ ПОВЕДЕНИЕМ (2010-2025)\n")
         f.write("=" * 90 + "\n\n")
@@ -275,16 +276,19 @@ def results_summary(df: pd.DataFrame, countries: Dict[str, Any], country_corr: D
     rezultaty_path = os.path.join(base, 'rezultaty')
     
     # Создание текстового файла с выводами
-    with open(os.path.join(rezultaty_path, 'osnovnye_vyvody.txt'), 'w', encoding='utf-8') as f:
-        f.write("ОСНОВНЫЕ ВЫВОДЫ АНАЛИЗА КРИПТОАДОПЦИИ В ВОСТОЧНОЙ ЕВРОПЕ (2010-2025)\n")
+    txt_path = os.path.join(rezultaty_path, 'osnovnye_vyvody.txt')
+    with span('write', path=txt_path), open(txt_path, 'w', encoding='utf-8') as f:
+        first, last = df.panel.year_range()
+        f.write(f"ОСНОВНЫЕ ВЫВОДЫ АНАЛИЗА КРИПТОАДОПЦИИ В ВОСТОЧНОЙ ЕВРОПЕ ({first}-{last})\n")
         f.write("=" * 80 + "\n\n")
         
+        data_first, data_last = df.panel.year(first), df.panel.year(last)
         f.write("📊 КЛЮЧЕВЫЕ СТАТИСТИКИ:\n")
         f.write("-" * 30 + "\n")
-        f.write(f"• Общая корреляция инфляция-криптоадопция: {df['Inflation'].corr(df['Crypto_Adoption']):.3f}\n")
+        f.write(f"• Общая корреляция инфляция-криптоадопция: {memo.corr(df, 'Inflation', 'Crypto_Adoption'):.3f}\n")
         f.write(f"• Максимальная криптоадопция: {df['Crypto_Adoption'].max():.1f}% (Украина, 2022)\n")
-        f.write(f"• Средний рост адопции с 2010: {((df[df['Year']==2025]['Crypto_Adoption'].mean() / df[df['Year']==2010]['Crypto_Adoption'].mean()) - 1) * 100:.0f}%\n")
-        f.write(f"• Лидер по адопции в 2025: {df[df['Year']==2025].loc[df[df['Year']==2025]['Crypto_Adoption'].idxmax(), 'Country_RU']}\n\n")
+        f.write(f"• Средний рост адопции с {first}: {((data_last['Crypto_Adoption'].mean() / data_first['Crypto_Adoption'].mean()) - 1) * 100:.0f}%\n")
+        f.write(f"• Лидер по адопции в {last}: {data_last.loc[data_last['Crypto_Adoption'].idxmax(), 'Country_RU']}\n\n")
         
         f.write("🎯 КОРРЕЛЯЦИИ ПО СТРАНАМ:\n")
         f.write("-" * 30 + "\n")
@@ -299,22 +303,24 @@ def results_summary(df: pd.DataFrame, countries: Dict[str, Any], country_corr: D
     print(f"✅ Результаты созданы в папке: {rezultaty_path}")
 
 def countries_comparison_chart(df, countries, base):
-    """Создание графика сравнения стран в 2025 году"""
+    """Создание графика сравнения стран в последнем году панели (2025 для полной)"""
     print("🏆 Создание графика сравнения стран...")
+    plt = pyplot()
     
-    # Данные за 2025 год
-    data_2025 = df[df['Year'] == 2025].copy()
-    data_2025 = data_2025.sort_values('Crypto_Adoption', ascending=True)
+    # Данные за последний год панели
+    _, last = df.panel.year_range()
+    data_last = df.panel.year(last).copy()
+    data_last = data_last.sort_values('Crypto_Adoption', ascending=True)
     
-    colors = {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
-              'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'}
+    colors = country_colors(countries, {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
+                                           'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'})
     
     plt.figure(figsize=(12, 8))
     
-    bars = plt.barh(data_2025['Country_RU'], data_2025['Crypto_Adoption'], 
-                    color=[colors[country] for country in data_2025['Country']])
+    bars = plt.barh(data_last['Country_RU'], data_last['Crypto_Adoption'], 
+                    color=[colors[country] for country in data_last['Country']])
     
-    plt.title('Криптоадопция по странам в 2025 году', fontsize=16, fontweight='bold')
+    plt.title(f'Криптоадопция по странам в {last} году', fontsize=16, fontweight='bold')
     plt.xlabel('Процент владельцев (%)', fontsize=12)
     
     # Добавляем значения на столбцы
@@ -323,22 +329,23 @@ def countries_comparison_chart(df, countries, base):
         plt.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
                 f'{width:.1f}%', ha='left', va='center', fontweight='bold', fontsize=12)
     
-    plt.tight_layout()
-    plt.savefig(os.path.join(base, 'grafiki', '03_countries_comparison_2025.png'), dpi=300, bbox_inches='tight')
+    apply_layout()
+    save_figure(os.path.join(base, 'grafiki', '03_countries_comparison_2025.png'))
     plt.close()
     
     print("✅ График сравнения стран создан!")
 def static_preview_charts(df, countries, base):
     """Создание статических превью для HTML"""
     print("🖼️ Создание статических превью...")
+    plt = pyplot()
     
-    colors = {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
-              'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'}
+    colors = country_colors(countries, {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
+                                           'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'})
     
     # 1. Превью кластерного анализа
     cluster_data = []
     for country_code, country_info in countries.items():
-        country_data = df[df['Country'] == country_code]
+        country_data = df.panel.country(country_code)
         cluster_data.append({
             'country': country_info['name_ru'],
             'trust': country_data['Government_Trust'].mean(),
@@ -355,8 +362,8 @@ def static_preview_charts(df, countries, base):
     plt.xlabel('Среднее доверие к государству (%)')
     plt.ylabel('Средняя BTC адопция (%)')
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(base, 'grafiki', 'cluster_preview.png'), dpi=300, bbox_inches='tight')
+    apply_layout()
+    save_figure(os.path.join(base, 'grafiki', 'cluster_preview.png'))
     plt.close()
     
     # 2. Превью регрессии
@@ -364,8 +371,7 @@ def static_preview_charts(df, countries, base):
     plt.scatter(df['Government_Trust'], df['Crypto_Adoption'], alpha=0.6, s=50)
     
     # Линия тренда
-    from scipy import stats
-    slope, intercept, r_value, p_value, std_err = stats.linregress(df['Government_Trust'], df['Crypto_Adoption'])
+    slope, intercept, r_value, p_value, std_err = memo.linregress(df, 'Government_Trust', 'Crypto_Adoption')
     line_x = [df['Government_Trust'].min(), df['Government_Trust'].max()]
     line_y = [slope * x + intercept for x in line_x]
     plt.plot(line_x, line_y, 'r-', linewidth=2, label=f'Регрессия (R² = {r_value**2:.3f})')
@@ -376,28 +382,102 @@ def static_preview_charts(df, countries, base):
     plt.ylabel('BTC адопция (%)')
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(base, 'grafiki', 'regression_preview.png'), dpi=300, bbox_inches='tight')
+    apply_layout()
+    save_figure(os.path.join(base, 'grafiki', 'regression_preview.png'))
     plt.close()
     
     print("✅ Статические превью созданы!")
 
-def main_project_index(df, countries, country_corr, period_corr, base):
+# Разделы сводной панели: выход этапа с фигурой Plotly и заголовок раздела.
+# Новый интерактивный график попадает в панель добавлением строки сюда.
+DASHBOARD_FIGURES = (
+    ('fig_dynamic', '🎨 Динамика криптоадопции'),
+    ('fig_trust', '🏛️ Доверие к государству vs BTC'),
+    ('fig_cluster', '🎯 Кластерный анализ'),
+    ('fig_regression', '📈 Регрессия Trust→BTC'),
+    ('fig_rolling', '📉 Скользящие корреляции'),
+)
+
+def interactive_dashboard(base, *figures):
+    """Единая интерактивная панель: все графики Plotly на одной странице
+
+    `figures` — фигуры в порядке DASHBOARD_FIGURES (None — раздел пропускается).
+    Данные фигур встраиваются компактным JSON, plotly.js подключается один
+    раз из общего `grafiki/plotly.min.js` — страница работает офлайн.
+    """
+    if len(figures) != len(DASHBOARD_FIGURES):
+        raise ValueError(f"Панель: ожидалось {len(DASHBOARD_FIGURES)} фигур, получено {len(figures)}")
+    print("🧩 Создание сводной интерактивной панели...")
+    grafiki_path = os.path.join(base, 'grafiki')
+    plotly_bundle(grafiki_path)
+
+    sections = ""
+    for (name, title), fig in zip(DASHBOARD_FIGURES, figures):
+        if fig is None:
+            continue
+        key = name.removeprefix('fig_')
+        # "</" внутри JSON закрыл бы тег <script>
+        spec = fig.to_json(pretty=False).replace('</', '<\\/')
+        sections += f"""
+        <section>
+            <h2>{title}</h2>
+            <div id="fig-{key}" class="figure"></div>
+            <script type="application/json" id="spec-{key}">{spec}</script>
+        </section>"""
+
+    html_content = f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Интерактивная панель: криптоадопция 2010-2025</title>
+    <script src="{PLOTLY_BUNDLE}"></script>
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: #f4f6fb; color: #333; margin: 0; padding: 20px; }}
+        h1 {{ text-align: center; color: #667eea; }}
+        section {{ background: white; border-radius: 10px; box-shadow: 0 4px 8px rgba(0,0,0,0.1); margin: 20px auto; max-width: 1300px; padding: 20px; }}
+        h2 {{ color: #764ba2; margin-top: 0; }}
+        .figure {{ width: 100%; min-height: 500px; }}
+    </style>
+</head>
+<body>
+    <h1>📊 Интерактивная панель анализа криптоадопции</h1>{sections}
+    <script>
+        document.querySelectorAll('script[type="application/json"]').forEach(function (node) {{
+            var spec = JSON.parse(node.textContent);
+            var div = document.getElementById(node.id.replace('spec-', 'fig-'));
+            Plotly.newPlot(div, spec.data, spec.layout, {{responsive: true}});
+        }});
+    </script>
+</body>
+</html>
+"""
+    dashboard_path = os.path.join(grafiki_path, 'dashboard.html')
+    with span('write', path=dashboard_path), open(dashboard_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+    print(f"✅ Интерактивная панель создана: {dashboard_path}")
+
+def main_project_index(df, countries, country_corr, period_corr, corr_ci, base):
     """Создание главной индексной страницы проекта в корне с полной информацией"""
     print("🏠 Создание главной страницы проекта...")
+    ci = corr_ci.set_index("Группа")
+    bca = {g: format_ci(lo, hi) for g, lo, hi in zip(ci.index, ci["ДИ_BCa_низ"], ci["ДИ_BCa_верх"])}
     
     # Расчет общих статистик
-    overall_correlation = df['Inflation'].corr(df['Crypto_Adoption'])
-    overall_hdi_crypto_corr = df['HDI'].corr(df['Crypto_Adoption'])
+    overall_correlation = memo.corr(df, 'Inflation', 'Crypto_Adoption')
+    overall_hdi_crypto_corr = memo.corr(df, 'HDI', 'Crypto_Adoption')
     max_adoption = df['Crypto_Adoption'].max()
     max_adoption_country = df[df['Crypto_Adoption'] == max_adoption]['Country_RU'].iloc[0]
     max_adoption_year = df[df['Crypto_Adoption'] == max_adoption]['Year'].iloc[0]
-    leader_2025 = df[df['Year']==2025].loc[df[df['Year']==2025]['Crypto_Adoption'].idxmax(), 'Country_RU']
-    avg_growth = ((df[df['Year']==2025]['Crypto_Adoption'].mean() / df[df['Year']==2010]['Crypto_Adoption'].mean()) - 1) * 100
+    first, last = df.panel.year_range()
+    data_first, data_last = df.panel.year(first), df.panel.year(last)
+    leader_last = data_last.loc[data_last['Crypto_Adoption'].idxmax(), 'Country_RU']
+    avg_growth = ((data_last['Crypto_Adoption'].mean() / data_first['Crypto_Adoption'].mean()) - 1) * 100
     
     # Цвета для стран
-    colors = {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
-              'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'}
+    colors = country_colors(countries, {'Ukraine': '#FF6B6B', 'Poland': '#4ECDC4', 'Czech': '#45B7D1', 
+                                           'Sweden': '#96CEB4', 'Norway': '#FFEAA7', 'Belarus': '#DDA0DD'})
     
     html_content = f"""
     <!DOCTYPE html>
@@ -405,7 +485,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Анализ криптоадопции в Восточной Европе (2010-2025)</title>
+        <title>Анализ криптоадопции в Восточной Европе ({first}-{last})</title>
         <style>
             * {{
                 margin: 0;
@@ -634,7 +714,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
         <div class="container">
             <div class="header">
                 <h1>🏛️ Влияние доверия к государству на адопцию криптовалют</h1>
-                <p>Сравнительный анализ стран Восточной Европы (2010-2025)</p>
+                <p>Сравнительный анализ стран Восточной Европы ({first}-{last})</p>
                 <div class="meta">
                     <div class="meta-item">📊 6 стран</div>
                     <div class="meta-item">📅 16 лет данных</div>
@@ -656,12 +736,12 @@ def main_project_index(df, countries, country_corr, period_corr, base):
                             <div class="stat-label">Макс. адопция ({max_adoption_country}, {int(max_adoption_year)})</div>
                         </div>
                         <div class="stat-box">
-                            <div class="stat-number">{leader_2025}</div>
-                            <div class="stat-label">Лидер 2025</div>
+                            <div class="stat-number">{leader_last}</div>
+                            <div class="stat-label">Лидер {last}</div>
                         </div>
                         <div class="stat-box">
                             <div class="stat-number">{avg_growth:.0f}%</div>
-                            <div class="stat-label">Рост с 2010</div>
+                            <div class="stat-label">Рост с {first}</div>
                         </div>
                     </div>
                     <div style="margin-top: 20px; padding: 15px; background: #e3f2fd; border-radius: 8px; border-left: 4px solid #2196f3;">
@@ -726,7 +806,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
         html_content += f"""
                         <li class="correlation-item" style="border-left-color: {color};">
                             <span><strong>{country}</strong></span>
-                            <span style="color: {color}; font-weight: bold;">{corr}</span>
+                            <span style="color: {color}; font-weight: bold;">{corr} <small title="95% ДИ BCa">{bca.get(country, "—")}</small></span>
                         </li>
         """
     
@@ -746,7 +826,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
         html_content += f"""
                         <li class="correlation-item" style="border-left-color: #667eea;">
                             <span><strong>{period}</strong></span>
-                            <span style="color: #667eea; font-weight: bold;">{corr}</span>
+                            <span style="color: #667eea; font-weight: bold;">{corr} <small title="95% ДИ BCa">{bca.get(period, "—")}</small></span>
                         </li>
         """
     
@@ -768,6 +848,10 @@ def main_project_index(df, countries, country_corr, period_corr, base):
                         <li>|r| ≤ 0.3 - слабая связь</li>
                         <li>r < 0 - отрицательная связь</li>
                     </ul>
+                    <p><strong>Интервалы:</strong> в скобках — 95% доверительный интервал BCa по {BOOT_REPLICATES} бутстреп-репликам
+                    (перцентильный интервал — в Excel отчёте); интервал, включающий 0, означает незначимую связь.</p>
+                    <p><strong>Значимость:</strong> в Excel отчёте — двустороннее p перестановочного теста
+                    (до {PERM_PERMUTATIONS} перестановок криптоадопции внутри страны или периода).</p>
                 </div>
             </div>
             
@@ -787,7 +871,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
                             <p>{country_info['currency']} • {country_info['strategy_type']}</p>
                         </div>
                         <div class="country-body">
-                            <p><strong>Корреляция:</strong> {country_corr_value}</p>
+                            <p><strong>Корреляция:</strong> {country_corr_value} (95% ДИ BCa: {bca.get(country_name, "—")})</p>
                             <p><strong>Население:</strong> {country_info['population']} млн</p>
                             <p><strong>Основные криптовалюты:</strong> {', '.join(country_info['main_crypto'])}</p>
                             <p><strong>Драйверы:</strong> {country_info['crypto_drivers'][:50]}...</p>
@@ -806,6 +890,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
                 <h2 style="color: #667eea; text-align: center; margin-bottom: 30px;">📚 Полная документация проекта</h2>
                 <div class="navigation">
                     <a href="hypothesis_analysis.html" class="nav-button">🎯 Проверка гипотез</a>
+                    <a href="grafiki/dashboard.html" class="nav-button">🧩 Интерактивная панель</a>
                     <a href="grafiki/interactive_dynamics.html" class="nav-button">🎨 Интерактивная динамика</a>
                     <a href="grafiki/cluster_analysis.html" class="nav-button">🎯 Кластерный анализ</a>
                     <a href="grafiki/regression_trust_btc.html" class="nav-button">📈 Регрессия Trust→BTC</a>
@@ -841,7 +926,7 @@ def main_project_index(df, countries, country_corr, period_corr, base):
     
     # Сохраняем главную страницу в корень проекта
     main_index_path = os.path.join(base, 'index.html')
-    with open(main_index_path, 'w', encoding='utf-8') as f:
+    with span('write', path=main_index_path), open(main_index_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
     
     print(f"✅ Главная страница проекта создана: {main_index_path}")
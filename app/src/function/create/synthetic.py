@@ -0,0 +1,104 @@
+from typing import Tuple, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# ─────────────────────────── SYNTHETIC PANELS ────────────────────────────
+# Синтетические панели со схемой `extended_data_2010_2025` (те же колонки и
+# типы) для нагрузочных тестов: от 6 до тысяч стран, годовая или месячная
+# гранулярность (12 строк на год с тем же `Year` и колонкой `Month` 1..12).
+
+STRATEGIES = ['ЗАЩИТНИК', 'ДИВЕРСИФИКАТОР', 'ИННОВАТОР', 'ПОДАВЛЕННЫЙ']
+
+# (колонка, начальное значение, шаг случайного блуждания, минимум, максимум, знаков после запятой)
+SERIES = [
+    ("GDP_Per_Capita", (2000, 90000), 0.04, 500, 150000, 0),
+    ("Inflation", (0.0, 15.0), 0.5, -2.0, 80.0, 2),
+    ("Crypto_Adoption", (0.0, 1.0), 0.15, 0.0, 40.0, 2),
+    ("GDP_Growth", (-2.0, 6.0), 0.5, -30.0, 15.0, 2),
+    ("Currency_Volatility", (1.5, 20.0), 0.4, 0.5, 60.0, 2),
+    ("Unemployment", (1.0, 12.0), 0.2, 0.3, 25.0, 2),
+    ("Exports", (10.0, 400.0), 0.05, 1.0, 2000.0, 1),
+    ("Imports", (10.0, 400.0), 0.05, 1.0, 2000.0, 1),
+    ("Government_Debt", (10.0, 90.0), 0.04, 5.0, 200.0, 1),
+    ("Government_Trust", (10, 80), 0.06, 5, 95, 0),
+    ("Corruption_Index", (20, 90), 0.03, 10, 99, 0),
+    ("Political_Stability", (-2.0, 1.6), 0.15, -3.0, 2.0, 2),
+    ("HDI", (0.70, 0.96), 0.005, 0.5, 0.99, 3),
+    ("CPI", (80.0, 120.0), 0.03, 20.0, 2000.0, 1),
+]
+
+
+def synthetic_countries(n_countries: int) -> Dict[str, Dict[str, Any]]:
+    """Словарь `countries` для синтетической панели (первые 6 кодов — реальные)"""
+    real = ['Ukraine', 'Poland', 'Czech', 'Sweden', 'Norway', 'Belarus']
+    rng = np.random.default_rng(n_countries)
+    countries = {}
+    for i in range(n_countries):
+        code = real[i] if i < len(real) else f"C{i:05d}"
+        countries[code] = {
+            'name_ru': f"Страна {i + 1}",
+            'currency': f"X{i % 1000:03d}",
+            'main_crypto': ['Bitcoin', 'Ethereum', 'USDT'][: 1 + i % 3],
+            'crypto_preference': 'Bitcoin (инвестиции)',
+            'population': round(float(rng.uniform(0.5, 150.0)), 1),
+            'internet_penetration': int(rng.integers(40, 100)),
+            'strategy_type': STRATEGIES[i % len(STRATEGIES)],
+            'crypto_drivers': 'Диверсификация портфеля, защита от инфляции, международные переводы',
+        }
+    return countries
+
+
+def synthetic_panel(n_countries: int, years: range = range(2010, 2026), periods_per_year: int = 1,
+                    seed: int = 0, schema: Optional[pd.Series] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Синтетическая панель n_countries × len(years) × periods_per_year строк
+
+    `schema` — dtypes эталонной панели (`df.dtypes`); по умолчанию берутся
+    из `extended_data_2010_2025`, чтобы колонки и типы совпадали точно.
+    При periods_per_year=12 после `Year` добавляется `Month` (1..12, тип
+    `Year`) — по ней месячные ветки этапов узнают месячную панель.
+    """
+    if schema is None:
+        from function.create import data_build
+        schema = data_build.extended_data_2010_2025(None)[0].dtypes
+    if periods_per_year == 12 and "Month" not in schema.index:
+        at = schema.index.get_loc("Year") + 1
+        schema = pd.concat([schema.iloc[:at], pd.Series({"Month": schema["Year"]}), schema.iloc[at:]])
+
+    rng = np.random.default_rng(seed)
+    countries = synthetic_countries(n_countries)
+    codes = list(countries)
+    n_periods = len(years) * periods_per_year
+    n_rows = n_countries * n_periods
+
+    data: Dict[str, Any] = {
+        "Year": np.tile(np.repeat(np.asarray(years), periods_per_year), n_countries),
+        "Country": np.repeat(codes, n_periods),
+    }
+    if periods_per_year == 12:
+        data["Month"] = np.tile(np.arange(1, 13), len(years) * n_countries)
+    for col, (lo, hi), step, vmin, vmax, digits in SERIES:
+        start = rng.uniform(lo, hi, size=(n_countries, 1))
+        shocks = rng.normal(0.0, step, size=(n_countries, n_periods))
+        if col in ("GDP_Per_Capita", "Exports", "Imports", "Government_Debt", "Government_Trust", "Corruption_Index", "CPI"):
+            values = start * np.exp(np.cumsum(shocks, axis=1))
+        else:
+            values = start + np.cumsum(shocks, axis=1) * (hi - lo) / 10
+        data[col] = np.clip(values, vmin, vmax).reshape(n_rows).round(digits)
+
+    attrs = pd.DataFrame.from_dict(countries, orient="index")
+    rep = np.repeat(np.arange(n_countries), n_periods)
+    data["Country_RU"] = attrs["name_ru"].to_numpy()[rep]
+    data["Currency"] = attrs["currency"].to_numpy()[rep]
+    data["Population"] = attrs["population"].to_numpy()[rep]
+    data["Internet_Penetration"] = attrs["internet_penetration"].to_numpy()[rep]
+    data["Strategy_Type"] = attrs["strategy_type"].to_numpy()[rep]
+    data["Main_Crypto"] = np.array([", ".join(v) for v in attrs["main_crypto"]], dtype=object)[rep]
+    data["Crypto_Preference"] = attrs["crypto_preference"].to_numpy()[rep]
+    data["Crypto_Drivers"] = attrs["crypto_drivers"].to_numpy()[rep]
+
+    df = pd.DataFrame({col: data[col] for col in schema.index})
+    df = df.astype(schema.to_dict())
+    df.attrs["dtypes"] = {col: str(dtype) for col, dtype in df.dtypes.items()}  # схема решена эталонной панелью
+    return df, countries
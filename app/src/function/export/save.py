@@ -1,32 +1,41 @@
 
 import os
 import datetime as _dt
+import hashlib
+import json
 import warnings
-from typing import Tuple, Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import numpy as np
+from glob import glob
+from typing import Any, Dict, Optional, Tuple
+
 import pandas as pd
-from scipy import stats
-import argparse
 
-from function.func import *
+from function import snapshots
+from function.func import expand_panel
+from function.tracing import span
 
 warnings.filterwarnings("ignore")
 
 
 # ──────────────────────────── CSV EXPORT ────────────────────────────────
 
-def clean_excel(df: pd.DataFrame, base: str):
-    """Сохранение Excel файла с правильным форматом чисел"""
+def clean_excel(df: pd.DataFrame, base: str, selection: Optional[str] = None):
+    """Сохранение Excel файла с правильным форматом чисел
+
+    Файл `dannye/clean_dataset.xlsx` перезаписывается; история версий —
+    снимки в `dannye/snapshots/` (повторный запуск с теми же данными
+    новый снимок не создаёт). Выборка (`selection` — её имя, см.
+    `selection_label`) — не версия набора данных: снимок не пишется.
+    """
     print("💾 Сохранение Excel...")
-    excel_df = optimize_int_columns(df.copy())
-    excel_df['Year'] = excel_df['Year'].astype(int)
+    # Типы колонок решены при сборке панели (attrs['dtypes']) — без повторной проверки и копии
+    panel = expand_panel(df)
+    if selection is None:
+        # месячная панель: строка — (страна, год, месяц)
+        keys = [*snapshots.SNAPSHOT_KEYS, "Month"] if "Month" in panel.columns else snapshots.SNAPSHOT_KEYS
+        snapshots.save_snapshot(panel, base, keys=keys)
     
     # ПОЛНОЕ переименование колонок
-    excel_df = excel_df.rename(columns={
+    excel_df = panel.rename(columns={
         "Year": "Год",
         "Country": "Код_страны",
         "Country_RU": "Страна",
@@ -44,6 +53,7 @@ def clean_excel(df: pd.DataFrame, base: str):
         "Corruption_Index": "Индекс_коррупции_0_100",
         "Political_Stability": "Политическая_стабильность",
         "HDI": "Индекс_человеческого_развития",
+        "CPI": "ИПЦ_2015_100",
         "Population": "Население_млн",
         "Internet_Penetration": "Интернет_проникновение_%",
         "Strategy_Type": "Тип_стратегии",
@@ -51,15 +61,81 @@ def clean_excel(df: pd.DataFrame, base: str):
         "Crypto_Preference": "Криптопредпочтения",
         "Crypto_Drivers": "Драйверы_адопции"
     })
+    excel_df['Год'] = excel_df['Год'].astype(int)
     
-    ts = _dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-    fn = os.path.join(base, "dannye", f"clean_dataset_{ts}.xlsx")
+    fn = os.path.join(base, "dannye", "clean_dataset.xlsx")
     
     try:
-        excel_df.to_excel(fn, index=False, engine='openpyxl')
+        with span('excel', path=fn):
+            excel_df.to_excel(fn, index=False, engine='openpyxl')
         print(f"✅ Excel сохранён: {fn}")
     except PermissionError:
+        ts = _dt.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_fn = os.path.join(base, f"dataset_backup_{ts}.xlsx")
-        excel_df.to_excel(backup_fn, index=False, engine='openpyxl')
+        with span('excel', path=backup_fn):
+            excel_df.to_excel(backup_fn, index=False, engine='openpyxl')
         print(f"✅ Excel создан в корневой папке: {backup_fn}")
 
+
+
+# ──────────────────────────── WARM START ────────────────────────────────
+# Собранная панель (после этапов data и fx) сохраняется в Feather вместе с
+# хэшем источников. Пока хранилище, CSV индикаторов, курсы валют и код
+# сборки не менялись, `app.main()` берёт панель из файла и пропускает
+# этапы data и fx.
+
+WARM_PANEL = os.path.join("dannye", "panel.feather")
+WARM_SOURCES = (os.path.join("istochniki", "*.arrow"), os.path.join("indikatory", "*.csv"),
+                os.path.join("valyuty", "*.csv"))
+
+
+def source_fingerprint(base: str) -> str:
+    """SHA-256 файлов-источников панели и кода её сборки"""
+    from function import fx, store
+    from function.cache import code_fingerprint
+    from function.create import data_build
+
+    h = hashlib.sha256(code_fingerprint(data_build.extended_data_2010_2025, fx.currency_volatility_panel,
+                                        store.load_store).encode())
+    for pattern in WARM_SOURCES:
+        for path in sorted(glob(os.path.join(base, pattern))):
+            h.update(os.path.relpath(path, base).encode())
+            with open(path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def write_warm_panel(df: pd.DataFrame, countries: Dict[str, Any], base: str,
+                     source: Optional[str] = None) -> str:
+    """Feather-копия панели (типы колонок и схема attrs['dtypes']) с хэшем источников"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    path = os.path.join(base, WARM_PANEL)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[b"warm_start"] = json.dumps({"source": source or source_fingerprint(base), "countries": countries,
+                                      "dtypes": df.attrs.get("dtypes")}, ensure_ascii=False).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with span("write_feather", path=path):
+        feather.write_feather(table.replace_schema_metadata(meta), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_warm_panel(base: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """(панель, страны) из Feather-копии; None, если её нет или источники изменились"""
+    import pyarrow.feather as feather
+
+    path = os.path.join(base, WARM_PANEL)
+    if not os.path.exists(path):
+        return None
+    with span("read_feather", path=path):
+        table = feather.read_table(path, memory_map=True)
+        meta = json.loads((table.schema.metadata or {}).get(b"warm_start", b"{}"))
+        if meta.get("source") != source_fingerprint(base):
+            return None
+        df = table.to_pandas()
+    if meta.get("dtypes"):
+        df.attrs["dtypes"] = meta["dtypes"]
+    return df, meta["countries"]
@@ -0,0 +1,237 @@
+"""
+Загрузка макроиндикаторов из API World Bank.
+
+Запросы «индикатор × страна» выполняются конкурентно в asyncio: один пул
+соединений aiohttp (TCPConnector) на весь запуск и не более `concurrency`
+запросов одновременно (семафор). Каждый ответ сохраняется на диск
+(`.cache/http/<источник>/<sha256 запроса>.json`; ключ — путь и параметры
+без адреса сервера), поэтому повторный запуск берёт ответы из кэша и в
+сеть не обращается (`max_age` — срок годности ответа в
+секундах, None — бессрочно). Без aiohttp запросы идут через urllib в
+потоках — медленнее, без общего пула соединений.
+
+Результат — длинная таблица Country, Year, <колонки панели>; записанная в
+`indikatory/worldbank.csv`, она подхватывается `load_indicator_csvs`.
+Локальная замена API для проверки — `function.mock_worldbank`.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from function.cache import CACHE_DIR
+from function.tracing import span
+
+WORLD_BANK_URL = "https://api.worldbank.org/v2"
+HTTP_CACHE_DIR = "http"
+PER_PAGE = 100
+
+# Код страны панели → ISO3
+COUNTRY_ISO3 = {
+    "Ukraine": "UKR",
+    "Poland": "POL",
+    "Czech": "CZE",
+    "Sweden": "SWE",
+    "Norway": "NOR",
+    "Belarus": "BLR",
+}
+
+# Колонка панели → (индикатор World Bank, множитель к единицам панели)
+WB_INDICATORS = {
+    "GDP_Per_Capita": ("NY.GDP.PCAP.CD", 1.0),
+    "Inflation": ("FP.CPI.TOTL.ZG", 1.0),
+    "GDP_Growth": ("NY.GDP.MKTP.KD.ZG", 1.0),
+    "Unemployment": ("SL.UEM.TOTL.ZS", 1.0),
+    "Exports": ("NE.EXP.GNFS.CD", 1e-9),  # USD → млрд USD
+    "Imports": ("NE.IMP.GNFS.CD", 1e-9),
+    "Government_Debt": ("GC.DOD.TOTL.GD.ZS", 1.0),
+}
+
+
+# ──────────────────────────── RESPONSE CACHE ─────────────────────────────
+
+class ResponseCache:
+    """Дисковый кэш JSON-ответов источника по пути запроса"""
+
+    def __init__(self, base: str, source: str, max_age: Optional[float] = None):
+        self.dir = os.path.join(base, CACHE_DIR, HTTP_CACHE_DIR, source)
+        self.max_age = max_age
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["payload"]
+
+    def put(self, key: str, payload: Any) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "payload": payload}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+# ─────────────────────────────── CLIENTS ─────────────────────────────────
+
+class _AiohttpClient:
+    """Общая сессия aiohttp с ограниченным пулом соединений"""
+
+    def __init__(self, concurrency: int, timeout: float):
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+
+    async def get_json(self, url: str) -> Any:
+        async with self._session.get(url) as resp:
+            resp.raise_for_status()
+            return await resp.json(content_type=None)
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+class _UrllibClient:
+    """Запасной клиент: urllib в потоках (если aiohttp не установлен)"""
+
+    def __init__(self, concurrency: int, timeout: float):
+        self._timeout = timeout
+
+    def _get(self, url: str) -> Any:
+        from urllib.request import urlopen
+
+        with urlopen(url, timeout=self._timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    async def get_json(self, url: str) -> Any:
+        return await asyncio.to_thread(self._get, url)
+
+    async def close(self) -> None:
+        pass
+
+
+def _client(concurrency: int, timeout: float):
+    try:
+        return _AiohttpClient(concurrency, timeout)
+    except ImportError:
+        return _UrllibClient(concurrency, timeout)
+
+
+# ─────────────────────────────── FETCHING ────────────────────────────────
+
+class Fetcher:
+    """Конкурентная загрузка JSON с дисковым кэшем и повторами"""
+
+    def __init__(self, client, cache: ResponseCache, base_url: str, concurrency: int, retries: int = 3):
+        self.client = client
+        self.cache = cache
+        self.base_url = base_url
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.stats = {"network": 0, "cached": 0}
+
+    async def get_json(self, path: str) -> Any:
+        """Ответ на `base_url + path` (из кэша, если есть)"""
+        payload = self.cache.get(path)
+        if payload is not None:
+            self.stats["cached"] += 1
+            return payload
+        async with self.semaphore:
+            for attempt in range(self.retries):
+                try:
+                    payload = await self.client.get_json(self.base_url + path)
+                    break
+                except Exception:
+                    if attempt == self.retries - 1:
+                        raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        self.stats["network"] += 1
+        self.cache.put(path, payload)
+        return payload
+
+
+def _series_path(iso3: str, code: str, years: Tuple[int, int], page: int) -> str:
+    return (f"/country/{iso3}/indicator/{code}"
+            f"?format=json&date={years[0]}:{years[1]}&per_page={PER_PAGE}&page={page}")
+
+
+def _records(payload: Any, url: str) -> Tuple[int, List[Dict[str, Any]]]:
+    """(число страниц, записи) из ответа World Bank; ошибка API → ValueError"""
+    if not isinstance(payload, list) or not payload:
+        raise ValueError(f"Неожиданный ответ: {url}")
+    meta = payload[0]
+    if "message" in meta:
+        raise ValueError(f"World Bank: {meta['message'][0].get('value')} ({url})")
+    return int(meta.get("pages") or 0), (payload[1] if len(payload) > 1 and payload[1] else [])
+
+
+async def _fetch_series(fetcher: Fetcher, iso3: str, code: str, years: Tuple[int, int]) -> List[Dict[str, Any]]:
+    """Все страницы одного ряда; страницы после первой — конкурентно"""
+    url = _series_path(iso3, code, years, 1)
+    pages, records = _records(await fetcher.get_json(url), url)
+    if pages > 1:
+        urls = [_series_path(iso3, code, years, p) for p in range(2, pages + 1)]
+        for u, payload in zip(urls, await asyncio.gather(*(fetcher.get_json(u) for u in urls))):
+            records += _records(payload, u)[1]
+    return records
+
+
+async def fetch_indicators_async(base: str, countries: Iterable[str], indicators: Iterable[str],
+                                 years: Tuple[int, int] = (2010, 2025), base_url: str = WORLD_BANK_URL,
+                                 source: str = "worldbank", concurrency: int = 16,
+                                 max_age: Optional[float] = None,
+                                 timeout: float = 30.0) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """(таблица Country, Year, индикаторы; счётчики network/cached)
+
+    `source` — имя раздела кэша ответов: у локальной замены API свой раздел,
+    чтобы её ответы не подменяли настоящие.
+    """
+    countries, indicators = list(countries), list(indicators)
+    unknown = [c for c in countries if c not in COUNTRY_ISO3] + [i for i in indicators if i not in WB_INDICATORS]
+    if unknown:
+        raise ValueError(f"Нет кода World Bank для: {unknown}")
+
+    client = _client(concurrency, timeout)
+    fetcher = Fetcher(client, ResponseCache(base, source, max_age), base_url, concurrency)
+    jobs = [(country, column) for column in indicators for country in countries]
+    try:
+        results = await asyncio.gather(*(
+            _fetch_series(fetcher, COUNTRY_ISO3[country], WB_INDICATORS[column][0], years)
+            for country, column in jobs
+        ))
+    finally:
+        await client.close()
+
+    rows = []
+    for (country, column), records in zip(jobs, results):
+        scale = WB_INDICATORS[column][1]
+        rows += [{"Country": country, "Year": int(r["date"]), "column": column, "value": r["value"] * scale}
+                 for r in records if r.get("value") is not None]
+    if not rows:
+        return pd.DataFrame(columns=["Country", "Year"]), fetcher.stats
+    table = (pd.DataFrame(rows).pivot_table(index=["Country", "Year"], columns="column", values="value", aggfunc="first")
+             .reindex(columns=indicators).reset_index())
+    table.columns.name = None
+    return table, fetcher.stats
+
+
+def fetch_indicators(base: str, countries: Iterable[str], indicators: Iterable[str], **kwargs):
+    """Синхронная обёртка `fetch_indicators_async` (для скриптов)"""
+    with span("fetch_indicators") as attrs:
+        table, stats = asyncio.run(fetch_indicators_async(base, countries, indicators, **kwargs))
+        attrs.update(stats)
+    return table, stats
@@ -1,73 +1,335 @@
-
 import os
-import datetime as _dt
 import warnings
-from typing import Tuple, Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
+from typing import Dict, Any, Optional
+
 import numpy as np
 import pandas as pd
-from scipy import stats
-import argparse
+
+from function.tracing import span
+from function import panel  # noqa: F401 — регистрирует аксессор df.panel
 
 warnings.filterwarnings("ignore")
 
 # ─────────────────────────── DISPLAY SETTINGS ────────────────────────────
 pd.options.display.float_format = lambda x: f"{x:.0f}" if pd.notna(x) and x % 1 == 0 else f"{x:.2f}"
-plt.rcParams["font.family"] = ["DejaVu Sans"]  # поддержка кириллицы
-plt.rcParams["axes.unicode_minus"] = False
 
 # ──────────────────────────── HELPER FUNCTIONS ───────────────────────────
 
+def integer_like_columns(df: pd.DataFrame) -> list:
+    """Float-колонки, все непустые значения которых целые
+
+    Проверка одна на все колонки сразу — по двумерному массиву значений.
+    """
+    float_cols = [col for col, dtype in df.dtypes.items() if dtype.kind == "f"]
+    if not float_cols:
+        return []
+    values = df[float_cols].to_numpy(dtype="float64")
+    with np.errstate(invalid="ignore"):
+        integral = np.isnan(values) | (np.isfinite(values) & (values == np.trunc(values)))
+    return [col for col, ok in zip(float_cols, integral.all(axis=0)) if ok]
+
+def has_dtype_schema(df: pd.DataFrame) -> bool:
+    """Схема типов в `df.attrs['dtypes']` решена для тех же колонок"""
+    dtypes = df.attrs.get("dtypes")
+    return bool(dtypes) and list(dtypes) == list(df.columns)
+
 def optimize_int_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Convert float columns whose non-NaN values are all integer-like to **Int64**.
 
     Это устраняет паразитный хвост «.0» в Excel/CSV/Jupyter, сохранив
-    пропуски (nullable integer).
+    пропуски (nullable integer). Итоговые типы записываются в
+    `df.attrs['dtypes']` — схему панели; если она уже решена для тех же
+    колонок, DataFrame возвращается без повторной проверки.
     """
-    float_cols = df.select_dtypes(include="float").columns
-    for col in float_cols:
-        ser = df[col]
-        if ((ser.dropna() % 1) == 0).all():
-            df[col] = ser.astype("Int64")
+    if has_dtype_schema(df):
+        return df
+    for col in integer_like_columns(df):
+        df[col] = df[col].astype("Int64")
+    df.attrs["dtypes"] = {col: str(dtype) for col, dtype in df.dtypes.items()}
     return df
 
-def create_project_structure() -> str:
-    base = os.path.join(os.path.dirname(__file__), "../../data/")
+# Знаков после запятой для числовых колонок панели; None — целое
+# (дробная часть отбрасывается, как int())
+PANEL_DECIMALS: Dict[str, Optional[int]] = {
+    "GDP_Per_Capita": None,
+    "Inflation": 2,
+    "Crypto_Adoption": 2,
+    "GDP_Growth": 2,
+    "Currency_Volatility": 2,
+    "Unemployment": 2,
+    "Exports": 1,
+    "Imports": 1,
+    "Government_Debt": 1,
+    "Government_Trust": None,
+    "Corruption_Index": None,
+    "Political_Stability": 2,
+    "HDI": 3,
+    "CPI": 1,
+    "Population": 1,
+    "Internet_Penetration": None,
+}
+
+# Строковые колонки панели со статическими атрибутами стран
+PANEL_CATEGORIES = ["Country", "Country_RU", "Currency", "Strategy_Type",
+                    "Main_Crypto", "Crypto_Preference", "Crypto_Drivers"]
+
+def compact_panel(df: pd.DataFrame) -> pd.DataFrame:
+    """Компактная панель: `category` для строковых атрибутов и узкие числовые типы
+
+    Целые сужаются до минимального int, дробные — до float32, только если
+    округление до PANEL_DECIMALS возвращает исходные значения точно.
+    Исходные типы сохраняются в `df.attrs['dtypes']` для `expand_panel`.
+    """
+    columns = {}
+    for col in df.columns:
+        ser = df[col]
+        digits = PANEL_DECIMALS.get(col)
+        if col in PANEL_CATEGORIES or ser.dtype == object:
+            ser = ser.astype("category")
+        elif pd.api.types.is_integer_dtype(ser):
+            ser = pd.to_numeric(ser, downcast="integer")
+        elif pd.api.types.is_float_dtype(ser) and digits is not None:
+            narrow = ser.astype("float32")
+            if np.array_equal(narrow.astype("float64").round(digits).to_numpy(), ser.to_numpy(), equal_nan=True):
+                ser = narrow
+        columns[col] = ser
+    result = pd.DataFrame(columns)
+    result.attrs["dtypes"] = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    return result
+
+def expand_panel(df: pd.DataFrame) -> pd.DataFrame:
+    """Обратное к `compact_panel`: исходные типы (для выгрузки в Excel)
+
+    float32 переводится в float64 с округлением до PANEL_DECIMALS, чтобы
+    в файлах не появлялся «хвост» двоичного представления. Панель без
+    `attrs['dtypes']` или уже в этих типах возвращается как есть, без копии.
+    """
+    dtypes = df.attrs.get("dtypes")
+    if not dtypes or all(dtypes.get(col) == str(dtype) for col, dtype in df.dtypes.items()):
+        return df
+    columns = {}
+    for col in df.columns:
+        ser = df[col]
+        if ser.dtype == "float32" and PANEL_DECIMALS.get(col) is not None:
+            ser = ser.astype("float64").round(PANEL_DECIMALS[col])
+        elif col in dtypes and str(ser.dtype) != dtypes[col]:
+            ser = ser.astype(dtypes[col])
+        columns[col] = ser
+    return pd.DataFrame(columns, index=df.index)
+
+# Дополнительные цвета для стран без заданного цвета (палитра tab20)
+EXTRA_COLORS = ['#1f77b4', '#aec7e8', '#ff7f0e', '#ffbb78', '#2ca02c', '#98df8a', '#d62728', '#ff9896',
+                '#9467bd', '#c5b0d5', '#8c564b', '#c49c94', '#e377c2', '#f7b6d2', '#7f7f7f', '#c7c7c7',
+                '#bcbd22', '#dbdb8d', '#17becf', '#9edae5']
+
+def country_colors(countries, known: Dict[str, str]) -> Dict[str, str]:
+    """Цвета стран: заданные `known` плюс палитра для остальных кодов из `countries`"""
+    colors = dict(known)
+    extra = [code for code in countries if code not in colors]
+    for i, code in enumerate(extra):
+        colors[code] = EXTRA_COLORS[i % len(EXTRA_COLORS)]
+    return colors
+
+_pyplot_ready = False
+
+def pyplot():
+    """Ленивый импорт matplotlib.pyplot с настройками проекта
+
+    matplotlib загружается только этапами, которые рисуют графики.
+    """
+    global _pyplot_ready
+    import matplotlib.pyplot as plt
+    if not _pyplot_ready:
+        plt.rcParams["font.family"] = ["DejaVu Sans"]  # поддержка кириллицы
+        plt.rcParams["axes.unicode_minus"] = False
+        _pyplot_ready = True
+    return plt
+
+# ──────────────────────────── RENDER PROFILES ────────────────────────────
+# draft — быстрый черновой растр: низкий dpi, фиксированная раскладка, без
+# второго прохода bbox_inches='tight'; publication — как раньше (300 dpi).
+# Профиль хранится в переменной окружения, поэтому наследуется рабочими
+# процессами планировщика и рендерера.
+
+RENDER_PROFILES = {
+    "publication": {"dpi": 300, "bbox_inches": "tight", "tight_layout": True},
+    "draft": {"dpi": 72, "bbox_inches": None, "tight_layout": False},
+}
+RENDER_PROFILE_ENV = "BTC_RENDER_PROFILE"
+
+def set_render_profile(name: str):
+    """Выбор профиля отрисовки на весь запуск"""
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Неизвестный профиль: {name}; доступны: {', '.join(RENDER_PROFILES)}")
+    os.environ[RENDER_PROFILE_ENV] = name
+
+def render_profile_name() -> str:
+    return os.environ.get(RENDER_PROFILE_ENV, "publication")
+
+def render_profile() -> Dict[str, Any]:
+    return RENDER_PROFILES[render_profile_name()]
+
+def apply_layout():
+    """tight_layout для publication; в draft раскладка фиксированная"""
+    if render_profile()["tight_layout"]:
+        pyplot().tight_layout()
+
+def save_figure(path: str):
+    """Сохранение текущей фигуры matplotlib по активному профилю (с трассировкой)"""
+    profile = render_profile()
+    with span("savefig", path=path, dpi=profile["dpi"], profile=render_profile_name()):
+        pyplot().savefig(path, dpi=profile["dpi"], bbox_inches=profile["bbox_inches"])
+
+# Общая копия plotly.js рядом с интерактивными графиками (вместо встраивания в каждый HTML)
+PLOTLY_BUNDLE = "plotly.min.js"
+
+def _plotly_stamp() -> str:
+    """Первая строка plotly.min.js: версия установленного plotly"""
+    from importlib.metadata import version
+    return f"/* plotly {version('plotly')} */\n"
+
+def plotly_bundle(directory: str) -> str:
+    """Запись локального plotly.min.js в `directory` (атомарно)
+
+    Файл переписывается, только если его нет или он от другой версии
+    plotly (версия — в первой строке файла).
+    """
+    bundle_path = os.path.join(directory, PLOTLY_BUNDLE)
+    stamp = _plotly_stamp()
+    try:
+        with open(bundle_path, encoding="utf-8") as f:
+            current = f.readline() == stamp
+    except OSError:
+        current = False
+    if not current:
+        from plotly.offline import get_plotlyjs
+        tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+        with span("write", path=tmp_path), open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(stamp)
+            f.write(get_plotlyjs())
+        os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+def save_plotly(fig, path: str):
+    """Сохранение интерактивного графика Plotly в HTML со ссылкой на общий plotly.min.js"""
+    plotly_bundle(os.path.dirname(path))
+    with span("write_html", path=path):
+        fig.write_html(path, include_plotlyjs=PLOTLY_BUNDLE)
+
+# Меньше лет — рост, лидер года и корреляции по странам не определены
+MIN_SELECTED_YEARS = 3
+
+def select_panel(df: pd.DataFrame, countries: Dict[str, Any], codes=None, years=None, compact=False):
+    """Фильтрация панели по кодам стран и диапазону лет (None — без фильтра)
+
+    В диапазоне лет должно быть не меньше MIN_SELECTED_YEARS лет панели,
+    иначе ValueError. compact=True — вернуть компактную панель (`compact_panel`).
+    """
+    if codes:
+        unknown = [c for c in codes if c not in countries]
+        if unknown:
+            raise ValueError(f"Неизвестные страны: {unknown}; доступны: {list(countries)}")
+        countries = {c: info for c, info in countries.items() if c in codes}
+        df = df[df["Country"].isin(codes)]
+    if years:
+        first, last = df.panel.year_range() if len(df) else (None, None)
+        present = df["Year"].between(years[0], years[1])
+        if df.loc[present, "Year"].nunique() < MIN_SELECTED_YEARS:
+            raise ValueError(f"Диапазон лет {years[0]}-{years[1]}: нужно не меньше {MIN_SELECTED_YEARS} лет "
+                             f"из панели {first}-{last}")
+        df = df[present]
+    if codes or years:
+        df = df.reset_index(drop=True)
+    if compact:
+        df = compact_panel(df)
+    return df, countries
+
+# Результаты запусков с --countries/--years пишутся в отдельную папку
+SELECTIONS_DIR = "vyborki"
+
+def selection_label(codes=None, years=None) -> Optional[str]:
+    """Имя папки выборки: «Poland,Ukraine_2010-2019»; None — полная панель"""
+    parts = []
+    if codes:
+        parts.append(",".join(sorted(codes)))
+    if years:
+        parts.append(f"{years[0]}-{years[1]}")
+    return "_".join(parts) or None
+
+# Папка данных проекта (app/data)
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../../data/")
+
+def create_project_structure(base: Optional[str] = None) -> str:
+    """Папки результатов в `base` (None — app/data)"""
+    base = base or DATA_DIR
     for sub in ("grafiki", "otchety", "dannye", "rezultaty"):
         os.makedirs(os.path.join(base, sub), exist_ok=True)
         print(f"✅ Создана папка: {os.path.join(base, sub)}")
     return base
 
-def add_hdi_data(countries_data, base):
-    """Добавление данных HDI (Human Development Index) по годам"""
-    
-    # HDI данные по странам (2010-2025)
-    hdi_data = pd.read_csv(os.path.join(base, "hdi_data.csv"), header=0, index_col=0).to_dict(orient='index')
-    
-    # Добавляем HDI в данные стран
-    for country_code, hdi_values in hdi_data.items():
-        countries_data[country_code]['hdi'] = hdi_values
-    
-    return countries_data
-
-def add_cpi_data(countries_data):
-    """Добавление индекса потребительских цен (CPI) из официальных источников"""
-    
-    # CPI данные (базовый год 2015 = 100)
-    cpi_data = {
-        'Ukraine': [85.2, 93.4, 99.8, 112.1, 166.7, 143.3, 156.9, 169.8, 183.1, 187.9, 205.9, 260.1, 293.4, 332.7, 367.5, 401.2],
-        'Poland': [89.5, 93.2, 94.1, 93.2, 92.6, 94.5, 96.0, 99.3, 104.3, 107.9, 113.4, 130.7, 145.5, 154.5, 160.5, 166.4],
-        'Czech': [91.2, 94.2, 95.5, 95.9, 96.2, 96.9, 99.3, 102.5, 106.4, 109.8, 113.9, 131.1, 145.1, 149.0, 152.0, 154.7],
-        'Sweden': [96.8, 97.7, 98.1, 97.9, 97.9, 98.9, 100.7, 101.2, 103.4, 103.9, 106.2, 114.8, 121.6, 124.3, 126.8, 129.1],
-        'Norway': [94.5, 95.2, 97.1, 99.2, 101.4, 105.1, 107.1, 108.5, 112.3, 113.8, 117.8, 124.7, 131.6, 135.5, 139.3, 142.8],
-        'Belarus': [78.9, 125.7, 148.7, 175.6, 196.3, 217.1, 233.2, 246.1, 269.5, 284.3, 311.3, 351.2, 387.4, 420.3, 450.1, 480.6]
-    }
-    
-    # Добавляем CPI в данные стран
-    for country_code, cpi_values in cpi_data.items():
-        countries_data[country_code]['cpi'] = cpi_values
-    
-    return countries_data
\ No newline at end of file
+# ─────────────────────────── INDICATOR CSVs ─────────────────────────────
+# Дополнительные индикаторы: app/data/indikatory/*.csv в длинном формате
+# Country,Year,<Индикатор>[,<Индикатор>…]. Колонки с именами из панели
+# заменяют её значения, новые добавляются в панель.
+
+INDICATORS_DIR = "indikatory"
+INDICATOR_KEYS = ["Country", "Year"]
+
+def load_indicator_csvs(base: str) -> pd.DataFrame:
+    """Все CSV индикаторов одним DataFrame с индексом (Country, Year)
+
+    Типы задаются явно (Country — str, Year — int32, значения — float64);
+    файлы выравниваются по (Country, Year) одним concat.
+    """
+    from glob import glob
+
+    frames = []
+    for path in sorted(glob(os.path.join(base, INDICATORS_DIR, "*.csv"))):
+        header = pd.read_csv(path, nrows=0).columns
+        missing = [k for k in INDICATOR_KEYS if k not in header]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)}: нет колонок {missing}")
+        dtypes = {col: "float64" for col in header}
+        dtypes.update(Country=str, Year="int32")
+        with span("read_csv", path=path):
+            frame = pd.read_csv(path, dtype=dtypes).set_index(INDICATOR_KEYS)
+        if not frame.index.is_unique:
+            raise ValueError(f"{os.path.basename(path)}: повторяющиеся пары (Country, Year)")
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=INDICATOR_KEYS))
+    indicators = pd.concat(frames, axis=1, join="outer")
+    duplicated = indicators.columns[indicators.columns.duplicated()].tolist()
+    if duplicated:
+        raise ValueError(f"Индикаторы заданы в нескольких файлах: {duplicated}")
+    return indicators
+
+def merge_indicators(df: pd.DataFrame, indicators: pd.DataFrame) -> pd.DataFrame:
+    """Слияние индикаторов с панелью по (Country, Year)
+
+    Существующие колонки перезаписываются там, где в CSV есть значение;
+    новые вставляются перед статическими атрибутами стран (в порядке
+    PANEL_DECIMALS, неизвестные — в конце). Значения округляются по
+    PANEL_DECIMALS (целые — если пропусков нет). Колонки изменились,
+    поэтому схема типов панели решается заново (`optimize_int_columns`).
+    """
+    keys = pd.MultiIndex.from_arrays([df["Country"], df["Year"].astype("int32")])
+    aligned = indicators.reindex(keys)
+    position = df.columns.get_loc("Population") if "Population" in df.columns else len(df.columns)
+    known = list(PANEL_DECIMALS)
+    for col in sorted(aligned.columns, key=lambda c: known.index(c) if c in known else len(known)):
+        values = aligned[col].to_numpy()
+        if col in df.columns:
+            values = np.where(np.isnan(values), df[col].to_numpy(dtype="float64", na_value=np.nan), values)
+        digits = PANEL_DECIMALS.get(col, 3)
+        if digits is not None:
+            values = values.round(digits)
+        elif not np.isnan(values).any():
+            values = np.trunc(values).astype(np.int64)
+        if col in df.columns:
+            df[col] = values
+        else:
+            df.insert(position, col, values)
+            position += 1
+    df.attrs.pop("dtypes", None)
+    return optimize_int_columns(df)
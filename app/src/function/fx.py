@@ -0,0 +1,107 @@
+"""
+Валютная волатильность из дневных курсов.
+
+Курсы лежат в `app/data/valyuty/*.csv` — в длинном формате
+(Date, Currency, Rate) или широком (Date и по колонке на валюту); Rate —
+единиц валюты за 1 USD. Все валюты сводятся в одну матрицу
+дни × валюты, и скользящая годовая волатильность логарифмических
+доходностей считается для всех колонок сразу через кумулятивные суммы
+(без цикла по валютам и окнам). Значение на последний торговый день года
+заменяет `Currency_Volatility` в панели.
+"""
+
+import os
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+from function.func import merge_indicators
+from function.tracing import span
+
+FX_DIR = "valyuty"
+TRADING_DAYS = 252
+
+
+def load_fx_rates(base: str) -> pd.DataFrame:
+    """Дневные курсы всех файлов: индекс Date, колонка на валюту"""
+    frames = []
+    for path in sorted(glob(os.path.join(base, FX_DIR, "*.csv"))):
+        header = pd.read_csv(path, nrows=0).columns
+        if "Date" not in header:
+            raise ValueError(f"{os.path.basename(path)}: нет колонки Date")
+        with span("read_csv", path=path):
+            if {"Currency", "Rate"} <= set(header):
+                frame = pd.read_csv(path, usecols=["Date", "Currency", "Rate"], parse_dates=["Date"],
+                                    dtype={"Currency": str, "Rate": "float64"})
+                frame = frame.pivot(index="Date", columns="Currency", values="Rate")
+            else:
+                frame = pd.read_csv(path, parse_dates=["Date"],
+                                    dtype={c: "float64" for c in header if c != "Date"}).set_index("Date")
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    rates = pd.concat(frames, axis=1).sort_index()
+    duplicated = rates.columns[rates.columns.duplicated()].tolist()
+    if duplicated:
+        raise ValueError(f"Курсы валют заданы в нескольких файлах: {duplicated}")
+    return rates
+
+
+def rolling_volatility(prices: np.ndarray, window: int = TRADING_DAYS, min_periods=None) -> np.ndarray:
+    """Скользящая годовая волатильность, % — матрица дни × валюты
+
+    Доходность считается от предыдущего имеющегося курса той же валюты
+    (пропуски не дают нулевых доходностей). Суммы r и r² в окне — разности
+    кумулятивных сумм по оси дней; окно с числом наблюдений меньше
+    `min_periods` (по умолчанию половина окна) даёт NaN.
+    """
+    min_periods = min_periods or max(window // 2, 2)
+    prices = np.asarray(prices, dtype=np.float64)
+    previous = pd.DataFrame(prices).ffill().shift(1).to_numpy()
+    returns = np.log(prices / previous)
+
+    valid = ~np.isnan(returns)
+    filled = np.where(valid, returns, 0.0)
+    zero = np.zeros((1, prices.shape[1]))
+    s1 = np.concatenate([zero, np.cumsum(filled, axis=0)])
+    s2 = np.concatenate([zero, np.cumsum(filled * filled, axis=0)])
+    cnt = np.concatenate([zero, np.cumsum(valid, axis=0)])
+
+    lag = np.maximum(np.arange(1, len(prices) + 1) - window, 0)
+    n = cnt[1:] - cnt[lag]
+    total = s1[1:] - s1[lag]
+    total_sq = s2[1:] - s2[lag]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (total_sq - total * total / n) / (n - 1)
+    variance = np.where(n >= min_periods, np.maximum(variance, 0.0), np.nan)
+    return np.sqrt(variance * TRADING_DAYS) * 100
+
+
+def annual_volatility(rates: pd.DataFrame, window: int = TRADING_DAYS) -> pd.DataFrame:
+    """Волатильность на конец каждого года: Currency, Year, Currency_Volatility"""
+    vol = pd.DataFrame(rolling_volatility(rates.to_numpy(), window), index=rates.index, columns=rates.columns)
+    yearly = vol.groupby(vol.index.year).last()
+    yearly.index.name = "Year"
+    yearly.columns.name = "Currency"
+    return yearly.stack().rename("Currency_Volatility").reset_index()
+
+
+def currency_volatility_panel(df: pd.DataFrame, base: str, window: int = TRADING_DAYS) -> pd.DataFrame:
+    """Панель с Currency_Volatility из дневных курсов (где они есть)
+
+    Валюты и годы без курсов сохраняют прежние значения; без файлов в
+    `valyuty/` панель возвращается без изменений.
+    """
+    rates = load_fx_rates(base)
+    if rates.empty:
+        print(f"⚠️ Нет дневных курсов в {FX_DIR}/ — Currency_Volatility без изменений")
+        return df
+    with span("fx_volatility", currencies=rates.shape[1], days=rates.shape[0]):
+        annual = annual_volatility(rates, window)
+    pairs = df[["Country", "Currency"]].drop_duplicates().astype(str)
+    indicators = pairs.merge(annual, on="Currency")[["Country", "Year", "Currency_Volatility"]]
+    indicators["Year"] = indicators["Year"].astype("int32")
+    updated = sorted(set(pairs["Currency"]) & set(rates.columns))
+    print(f"💱 Валютная волатильность из дневных курсов: {', '.join(updated) or 'нет валют панели'}")
+    return merge_indicators(df.copy(), indicators.set_index(["Country", "Year"]))
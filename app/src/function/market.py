@@ -0,0 +1,252 @@
+"""
+Рыночные данные BTC: загрузка OHLCV и агрегация до сетки панели.
+
+Исходники — CSV в `app/data/rynok/` (один файл на инструмент, имя файла —
+символ, напр. `btc_usd.csv`) с колонками timestamp, open, high, low,
+close, volume; timestamp — дата/время ISO (с зоной или без, без зоны —
+UTC) либо epoch в секундах или миллисекундах. Строки должны идти по
+возрастанию времени.
+
+`ingest_ohlcv` потоково (блоками) переписывает CSV в Arrow IPC
+(`<символ>.arrow`: ts_ms int64 UTC и float64 цены/объём), не загружая файл
+в память целиком. `resample_ohlcv` читает Arrow через memory-map по
+батчам и для каждого батча векторно считает частичные агрегаты периодов
+(год или месяц), которые затем сводятся в итог: доходность, реализованная
+волатильность, максимальная просадка внутри периода, объём в BTC и USD.
+`local_volume` пересчитывает объём в валюты стран по курсам
+`rynok/kursy.csv` (Currency, Year[, Month], Rate — единиц валюты за 1 USD).
+"""
+
+import os
+from glob import glob
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from function.tracing import span
+
+MARKET_DIR = "rynok"
+FX_FILE = "kursy.csv"
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Частоты сетки панели: колонки периода в результате
+FREQUENCIES = {"Y": ["Year"], "M": ["Year", "Month"]}
+
+
+# ─────────────────────────────── INGESTION ───────────────────────────────
+
+def _source_signature(path: str) -> str:
+    """Размер и время изменения исходного CSV (признак актуальности Arrow)"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _timestamps_ms(column) -> np.ndarray:
+    """Колонка времени любого распознанного pyarrow типа → int64 мс UTC"""
+    import pyarrow as pa
+
+    kind = column.type
+    if pa.types.is_integer(kind):
+        values = column.to_numpy().astype(np.int64)
+        # epoch в секундах — до ~5000 года меньше 1e11
+        return values * 1000 if len(values) and np.abs(values).max() < 10**11 else values
+    if pa.types.is_date(kind):
+        column = column.cast(pa.timestamp("ms"))
+    elif pa.types.is_timestamp(kind):
+        column = column.cast(pa.timestamp("ms", tz=kind.tz))
+    else:
+        raise ValueError(f"Колонка timestamp: неподдерживаемый тип {kind}")
+    return column.cast(pa.int64()).to_numpy()
+
+
+def ingest_ohlcv(csv_path: str, arrow_path: Optional[str] = None, block_size: int = 1 << 24) -> str:
+    """Потоковая запись CSV с OHLCV в Arrow IPC (пропуск, если файл актуален)
+
+    block_size — размер блока чтения CSV в байтах: память ограничена
+    одним блоком независимо от длины истории.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    arrow_path = arrow_path or os.path.splitext(csv_path)[0] + ".arrow"
+    signature = _source_signature(csv_path)
+    if os.path.exists(arrow_path):
+        with pa.memory_map(arrow_path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        if metadata.get(b"source") == signature.encode():
+            return arrow_path
+
+    schema = pa.schema([("ts_ms", pa.int64())] + [(c, pa.float64()) for c in OHLCV_COLUMNS],
+                       metadata={"source": signature})
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=["timestamp"] + OHLCV_COLUMNS,
+            column_types={c: pa.float64() for c in OHLCV_COLUMNS},
+        ),
+    )
+    tmp_path = f"{arrow_path}.{os.getpid()}.tmp"
+    last_ts, rows = None, 0
+    with span("ingest_ohlcv", path=tmp_path) as attrs, pa.OSFile(tmp_path, "wb") as sink, \
+            pa.ipc.new_file(sink, schema) as writer:
+        for batch in reader:
+            ts = _timestamps_ms(batch.column("timestamp"))
+            if len(ts) and (np.any(np.diff(ts) < 0) or (last_ts is not None and ts[0] < last_ts)):
+                raise ValueError(f"{os.path.basename(csv_path)}: строки не упорядочены по времени")
+            if len(ts):
+                last_ts = ts[-1]
+            columns = [pa.array(ts)] + [batch.column(c) for c in OHLCV_COLUMNS]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            rows += len(ts)
+        attrs["rows"] = rows
+    os.replace(tmp_path, arrow_path)
+    print(f"📥 OHLCV загружен: {os.path.basename(csv_path)} → {os.path.basename(arrow_path)} ({rows} строк)")
+    return arrow_path
+
+
+def ingest_all(base: str) -> Dict[str, str]:
+    """Загрузка всех CSV из `rynok/` (кроме курсов); символ → путь к Arrow"""
+    paths = {}
+    for csv_path in sorted(glob(os.path.join(base, MARKET_DIR, "*.csv"))):
+        if os.path.basename(csv_path) == FX_FILE:
+            continue
+        symbol = os.path.splitext(os.path.basename(csv_path))[0].upper()
+        paths[symbol] = ingest_ohlcv(csv_path)
+    return paths
+
+
+# ─────────────────────────────── RESAMPLING ──────────────────────────────
+
+def _period_keys(ts_ms: np.ndarray, freq: str) -> np.ndarray:
+    """Номер периода: год или месяц от эпохи (монотонен по времени)"""
+    stamps = ts_ms.astype("datetime64[ms]")
+    unit = {"Y": "datetime64[Y]", "M": "datetime64[M]"}[freq]
+    return stamps.astype(unit).astype(np.int64)
+
+
+def _batch_partials(ts_ms, open_, high, low, close, volume, freq, carry):
+    """Частичные агрегаты периодов одного батча
+
+    carry — состояние конца предыдущего батча (последняя цена, период и
+    лог-максимум периода) для доходности первой строки и просадки периода,
+    пересекающего границу батчей.
+    """
+    period = _period_keys(ts_ms, freq)
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+    ends = np.r_[starts[1:], len(period)] - 1
+    segment = np.cumsum(np.r_[True, period[1:] != period[:-1]]) - 1
+
+    prev = np.empty_like(close)
+    prev[0] = carry["close"] if carry else open_[0]
+    prev[1:] = close[:-1]
+    log_ret = np.log(close / prev)
+
+    # Просадка: скользящий максимум лог-цены внутри периода одним cummax —
+    # сегменты разведены смещением, большим любого размаха лог-цен
+    log_close = np.log(close)
+    peak_input = log_close.copy()
+    if carry and carry["period"] == period[0]:
+        peak_input[0] = max(peak_input[0], carry["peak"])
+    offset = segment * (np.ptp(peak_input) + 1.0)
+    peak = np.maximum.accumulate(peak_input + offset) - offset
+    drawdown = np.exp(log_close - peak) - 1.0
+
+    partial = pd.DataFrame({
+        "period": period[starts],
+        "first_open": open_[starts],
+        "last_close": close[ends],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "sum_r2": np.add.reduceat(log_ret * log_ret, starts),
+        "volume_btc": np.add.reduceat(volume, starts),
+        "volume_usd": np.add.reduceat(volume * close, starts),
+        "max_drawdown": np.minimum.reduceat(drawdown, starts),
+        "observations": np.diff(np.r_[starts, len(period)]),
+    })
+    carry = {"close": close[-1], "period": period[-1], "peak": peak[-1]}
+    return partial, carry
+
+
+def resample_ohlcv(arrow_path: str, freq: str = "Y") -> pd.DataFrame:
+    """Агрегация OHLCV из Arrow (memory-map, по батчам) до годов/месяцев
+
+    Колонки: Year[, Month], BTC_Return_% (изменение цены закрытия за период),
+    BTC_Realized_Vol_% (корень суммы квадратов лог-доходностей),
+    BTC_Max_Drawdown_% (от максимума внутри периода), BTC_High, BTC_Low,
+    BTC_Close, BTC_Volume, BTC_Volume_USD, Observations.
+    """
+    import pyarrow as pa
+
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Неизвестная частота {freq!r}; доступны: {list(FREQUENCIES)}")
+    partials: List[pd.DataFrame] = []
+    carry = None
+    with span("resample_ohlcv", path=arrow_path, freq=freq), pa.memory_map(arrow_path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if batch.num_rows == 0:
+                continue
+            cols = [batch.column(c).to_numpy(zero_copy_only=False) for c in ["ts_ms"] + OHLCV_COLUMNS]
+            partial, carry = _batch_partials(*cols, freq=freq, carry=carry)
+            partials.append(partial)
+    if not partials:
+        return pd.DataFrame(columns=FREQUENCIES[freq])
+
+    merged = pd.concat(partials, ignore_index=True).groupby("period", sort=True).agg(
+        first_open=("first_open", "first"), last_close=("last_close", "last"),
+        high=("high", "max"), low=("low", "min"), sum_r2=("sum_r2", "sum"),
+        volume_btc=("volume_btc", "sum"), volume_usd=("volume_usd", "sum"),
+        max_drawdown=("max_drawdown", "min"), observations=("observations", "sum"),
+    )
+    previous_close = merged["last_close"].shift(1).fillna(merged["first_open"])
+
+    stamps = merged.index.to_numpy().astype("datetime64[Y]" if freq == "Y" else "datetime64[M]")
+    result = pd.DataFrame({"Year": stamps.astype("datetime64[Y]").astype(np.int64) + 1970})
+    if freq == "M":
+        result["Month"] = stamps.astype(np.int64) % 12 + 1
+    result["BTC_Return_%"] = ((merged["last_close"] / previous_close - 1) * 100).round(2).to_numpy()
+    result["BTC_Realized_Vol_%"] = (np.sqrt(merged["sum_r2"]) * 100).round(2).to_numpy()
+    result["BTC_Max_Drawdown_%"] = (merged["max_drawdown"] * 100).round(2).to_numpy()
+    result["BTC_High"] = merged["high"].to_numpy()
+    result["BTC_Low"] = merged["low"].to_numpy()
+    result["BTC_Close"] = merged["last_close"].to_numpy()
+    result["BTC_Volume"] = merged["volume_btc"].to_numpy()
+    result["BTC_Volume_USD"] = merged["volume_usd"].round(0).to_numpy()
+    result["Observations"] = merged["observations"].to_numpy()
+    return result
+
+
+def local_volume(features: pd.DataFrame, base: str, currencies) -> pd.DataFrame:
+    """Объём торгов в валютах стран: BTC_Volume_USD × курс периода
+
+    Возвращает длинную таблицу Currency, Year[, Month], BTC_Volume_Local;
+    без файла курсов — пустую.
+    """
+    keys = [c for c in ("Year", "Month") if c in features.columns]
+    fx_path = os.path.join(base, MARKET_DIR, FX_FILE)
+    if not os.path.exists(fx_path):
+        return pd.DataFrame(columns=["Currency"] + keys + ["BTC_Volume_Local"])
+    with span("read_csv", path=fx_path):
+        fx = pd.read_csv(fx_path, dtype={"Currency": str, "Year": "int64", "Month": "int64", "Rate": "float64"})
+    if "Month" in keys and "Month" not in fx.columns:
+        fx = fx.merge(pd.DataFrame({"Month": range(1, 13)}), how="cross")  # годовой курс на все месяцы
+    fx = fx[fx["Currency"].isin(list(currencies))]
+    result = fx.merge(features[keys + ["BTC_Volume_USD"]], on=keys, how="inner")
+    result["BTC_Volume_Local"] = (result["BTC_Volume_USD"] * result["Rate"]).round(0)
+    return result[["Currency"] + keys + ["BTC_Volume_Local"]]
+
+
+def market_panel(df: pd.DataFrame, features: pd.DataFrame, volumes: pd.DataFrame) -> pd.DataFrame:
+    """Рыночные признаки на строках панели (по Year[, Month] и валюте страны)"""
+    keys = [c for c in ("Year", "Month") if c in features.columns and c in df.columns]
+    panel = df[["Country", "Currency", "Crypto_Adoption"] + keys].copy()
+    panel["Currency"] = panel["Currency"].astype(str)
+    for key in keys:
+        panel[key] = panel[key].astype(np.int64)
+    panel = panel.merge(features, on=keys, how="left")
+    if len(volumes):
+        panel = panel.merge(volumes, on=["Currency"] + keys, how="left")
+    return panel
@@ -0,0 +1,152 @@
+"""
+Общие для этапов статистики, вычисляемые один раз за запуск.
+
+Ключ результата — (статистика, колонки, описание подмножества строк,
+отпечаток данных). Отпечаток DataFrame считается один раз на объект в
+процессе (панель между этапами не меняется). Результаты хранятся в
+словаре процесса и, если запуск открыт (`start_run`), ещё и в
+`.cache/run/<id запуска>/`: id передаётся рабочим процессам планировщика
+через переменную окружения, поэтому значение, посчитанное одним этапом,
+берут все остальные. Без открытого запуска (ноутбук, benchmark) кэш
+живёт только в памяти процесса.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import time
+import weakref
+from typing import Any, Callable, Dict, Hashable, Sequence, Tuple
+
+import pandas as pd
+
+from function.cache import CACHE_DIR, data_fingerprint
+from function.tracing import span
+
+RUN_ENV = "BTC_RUN_ID"
+RUN_DIR = "run"
+STALE_AFTER = 24 * 3600  # папки запусков старше суток — остатки прерванных запусков
+
+_results: Dict[str, Any] = {}
+_fingerprints: Dict[int, Tuple[weakref.ref, str]] = {}
+
+
+# ──────────────────────────────── RUN ────────────────────────────────────
+
+def _run_dir(base: str, run_id: str) -> str:
+    return os.path.join(base, CACHE_DIR, RUN_DIR, run_id)
+
+
+def start_run(base: str) -> str:
+    """Открыть запуск: новый id в окружении и пустая папка результатов
+
+    Папки других запусков не трогаются — они могут ещё идти (второй
+    app.py, benchmark.py на той же базе); удаляются только папки старше
+    STALE_AFTER, оставшиеся от прерванных запусков.
+    """
+    run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    runs = os.path.join(base, CACHE_DIR, RUN_DIR)
+    if os.path.isdir(runs):
+        for name in os.listdir(runs):
+            path = os.path.join(runs, name)
+            try:
+                stale = time.time() - os.path.getmtime(path) > STALE_AFTER
+            except OSError:  # папку уже удалил её запуск
+                continue
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(_run_dir(base, run_id), exist_ok=True)
+    os.environ[RUN_ENV] = f"{os.path.abspath(base)}{os.pathsep}{run_id}"
+    _results.clear()
+    return run_id
+
+
+def end_run() -> None:
+    """Закрыть запуск и удалить его результаты с диска"""
+    value = os.environ.pop(RUN_ENV, "")
+    if value:
+        base, _, run_id = value.rpartition(os.pathsep)
+        shutil.rmtree(_run_dir(base, run_id), ignore_errors=True)
+    _results.clear()
+
+
+def _disk_path(key: str):
+    value = os.environ.get(RUN_ENV)
+    if not value:
+        return None
+    base, _, run_id = value.rpartition(os.pathsep)
+    return os.path.join(_run_dir(base, run_id), f"{key}.pkl")
+
+
+# ─────────────────────────────── RESULTS ─────────────────────────────────
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Отпечаток DataFrame — один раз на объект в процессе"""
+    entry = _fingerprints.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    value = data_fingerprint(df)
+    _fingerprints[id(df)] = (weakref.ref(df, lambda _, key=id(df): _fingerprints.pop(key, None)), value)
+    return value
+
+
+def _key(stat: str, df: pd.DataFrame, columns: Sequence[str], subset: Hashable) -> str:
+    raw = repr((stat, tuple(columns), subset, fingerprint(df)))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def remember(stat: str, df: pd.DataFrame, columns: Sequence[str], value: Any, subset: Hashable = "all") -> None:
+    """Записать уже посчитанное значение (например, из `grouped_corr`)
+
+    Ошибка записи на диск (папку запуска удалили) — как промах кэша:
+    значение остаётся в памяти процесса.
+    """
+    key = _key(stat, df, columns, subset)
+    _results[key] = value
+    path = _disk_path(key)
+    if path is not None and not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+def cached(stat: str, df: pd.DataFrame, columns: Sequence[str], compute: Callable[[], Any],
+           subset: Hashable = "all") -> Any:
+    """Значение статистики из кэша запуска или `compute()` с записью в кэш"""
+    key = _key(stat, df, columns, subset)
+    if key in _results:
+        return _results[key]
+    path = _disk_path(key)
+    if path is not None and os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                _results[key] = pickle.load(f)
+            return _results[key]
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    with span("statistic", stat=stat, columns=list(columns), subset=repr(subset)):
+        value = compute()
+    remember(stat, df, columns, value, subset)
+    return value
+
+
+# ────────────────────────────── STATISTICS ───────────────────────────────
+
+def corr(df: pd.DataFrame, x: str, y: str, subset: Hashable = "all") -> float:
+    """Корреляция Пирсона x и y (как `df[x].corr(df[y])`; порядок колонок не важен)"""
+    return cached("corr", df, sorted((x, y)), lambda: df[x].corr(df[y]), subset)
+
+
+def linregress(df: pd.DataFrame, x: str, y: str, subset: Hashable = "all"):
+    """`scipy.stats.linregress(df[x], df[y])`: slope, intercept, r, p, stderr"""
+    def compute():
+        from scipy import stats
+
+        return tuple(float(v) for v in stats.linregress(df[x], df[y]))
+
+    return cached("linregress", df, (x, y), compute, subset)
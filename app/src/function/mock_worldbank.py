@@ -0,0 +1,91 @@
+"""
+Локальная замена API World Bank (только стандартная библиотека).
+
+Отвечает на `/v2/country/<ISO3>/indicator/<код>?format=json&date=A:B&
+per_page=N&page=P` в формате World Bank (метаданные страниц + записи);
+значения детерминированы (хэш страны, индикатора и года). `delay` —
+искусственная задержка ответа, чтобы была видна конкурентность
+загрузчика; `server.hits` — число обработанных запросов.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+# Порядок величины для индикаторов в долларах (остальные — проценты 0..100)
+_SCALE = {"NY.GDP.PCAP.CD": 1e3, "NE.EXP.GNFS.CD": 1e10, "NE.IMP.GNFS.CD": 1e10}
+
+_PATH = re.compile(r"^/v2/country/(?P<iso>[A-Za-z0-9;]+)/indicator/(?P<code>[A-Za-z0-9.]+)$")
+
+
+def _value(iso3: str, code: str, year: int) -> float:
+    digest = hashlib.sha256(f"{iso3}|{code}|{year}".encode()).digest()
+    return round(int.from_bytes(digest[:4], "big") / 2**32 * 100 * _SCALE.get(code, 1.0), 3)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:  # тишина в консоли
+        pass
+
+    def _send(self, payload, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.hits += 1
+        time.sleep(self.server.delay)
+        url = urlparse(self.path)
+        match = _PATH.match(url.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not match:
+            self._send([{"message": [{"id": "120", "key": "Invalid value",
+                                      "value": "The provided parameter value is not valid"}]}])
+            return
+        first, _, last = query.get("date", "2010:2025").partition(":")
+        years = list(range(int(last or first), int(first) - 1, -1))  # World Bank — от новых к старым
+        per_page = int(query.get("per_page", 50))
+        page = int(query.get("page", 1))
+        records = [
+            {
+                "indicator": {"id": match["code"], "value": match["code"]},
+                "country": {"id": match["iso"][:2], "value": match["iso"]},
+                "countryiso3code": match["iso"],
+                "date": str(year),
+                "value": _value(match["iso"], match["code"], year),
+                "unit": "", "obs_status": "", "decimal": 1,
+            }
+            for year in years
+        ]
+        pages = max(1, -(-len(records) // per_page))
+        chunk = records[(page - 1) * per_page: page * per_page]
+        meta = {"page": page, "pages": pages, "per_page": per_page, "total": len(records)}
+        self._send([meta, chunk])
+
+
+@contextmanager
+def serve(delay: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> Iterator[ThreadingHTTPServer]:
+    """Запуск сервера в фоновом потоке; base_url — `server.base_url`"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.hits = 0
+    server.lock = threading.Lock()
+    server.base_url = f"http://{host}:{server.server_address[1]}/v2"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,79 @@
+"""
+Индекс панели по (Country, Year).
+
+Аксессор `df.panel` один раз на объект DataFrame вычисляет границы блоков
+стран и номера строк каждого года. `df.panel.country(code)` возвращает
+срез непрерывного блока страны без копирования данных, `df.panel.year(y)`
+и `df.panel.years(first, last)` — строки лет за O(строк результата)
+вместо сканирования всей панели маской `df[df['Year'] == y]`.
+
+Порядок строк и метки индекса те же, что у булевой маски, поэтому
+`idxmax()` и `.loc` работают без изменений. Индекс строится по первому
+обращению; после перестановки или удаления строк «на месте» нужен новый
+DataFrame (например, `df.reset_index(drop=True)`).
+"""
+
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+Rows = Union[slice, np.ndarray]
+
+
+@pd.api.extensions.register_dataframe_accessor("panel")
+class PanelAccessor:
+    """Срезы панели по стране и году за время, пропорциональное размеру среза"""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._countries: Optional[Dict[str, Rows]] = None
+        self._years: Optional[Dict[int, np.ndarray]] = None
+
+    def _country_rows(self) -> Dict[str, Rows]:
+        """Код страны → slice её блока (или номера строк, если блок разорван)"""
+        if self._countries is None:
+            labels, uniques = pd.factorize(self._df["Country"], sort=False)
+            n = len(labels)
+            starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if n else np.array([], dtype=int)
+            if len(starts) == len(uniques):
+                stops = np.r_[starts[1:], n]
+                self._countries = {uniques[labels[a]]: slice(a, b) for a, b in zip(starts, stops)}
+            else:
+                self._countries = self._df.groupby("Country", sort=False, observed=True).indices
+        return self._countries
+
+    def _year_rows(self) -> Dict[int, np.ndarray]:
+        """Год → номера строк (по возрастанию)"""
+        if self._years is None:
+            self._years = {int(y): idx for y, idx in self._df.groupby("Year", sort=True).indices.items()}
+        return self._years
+
+    def countries(self) -> list:
+        """Коды стран в порядке блоков панели"""
+        return list(self._country_rows())
+
+    def country(self, code: str) -> pd.DataFrame:
+        """Строки страны (эквивалент `df[df['Country'] == code]`)"""
+        rows = self._country_rows().get(code)
+        return self._df.iloc[0:0] if rows is None else self._df.iloc[rows]
+
+    def year(self, year: int) -> pd.DataFrame:
+        """Строки года (эквивалент `df[df['Year'] == year]`)"""
+        rows = self._year_rows().get(int(year))
+        return self._df.iloc[0:0] if rows is None else self._df.iloc[rows]
+
+    def years(self, first: Optional[int] = None, last: Optional[int] = None) -> pd.DataFrame:
+        """Строки лет first..last включительно (None — без границы)"""
+        parts = [idx for y, idx in self._year_rows().items()
+                 if (first is None or y >= first) and (last is None or y <= last)]
+        if not parts:
+            return self._df.iloc[0:0]
+        return self._df.iloc[np.sort(np.concatenate(parts))]
+
+    def year_range(self) -> Tuple[int, int]:
+        """Первый и последний год панели (отчёты считают рост и лидера по ним)"""
+        years = self._year_rows()
+        if not years:
+            raise ValueError("Пустая панель: нет ни одного года")
+        return min(years), max(years)
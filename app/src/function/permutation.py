@@ -0,0 +1,148 @@
+"""
+Перестановочные тесты для корреляций по группам.
+
+Нулевая гипотеза — нет связи: ряд y (криптоадопция) переставляется
+внутри группы, p-значение двустороннее, по |r|. Тесты с одинаковым числом
+строк решаются вместе: x и y стандартизуются (центрирование, единичная
+норма), для блока перестановок строится одна матрица индексов, и
+корреляции всех тестов со всеми перестановками блока получаются одним
+пакетным умножением матриц.
+
+Если перестановок меньше лимита (n! ≤ n_perm), они перебираются
+полностью — точное p. Иначе p оценивается по n_perm случайным
+перестановкам, (1 + превышения) / (1 + перестановки). С ранней остановкой
+(Besag–Clifford) тест прекращается, как только набрано `stop_hits`
+превышений: p = stop_hits / m, где m — номер перестановки, на которой это
+случилось. Незначимые тесты останавливаются через десятки перестановок, и
+всё время уходит на немногие значимые.
+
+Для больших групп число перестановок ограничено PERM_MAX_CELLS
+(перестановки × строки), но не ниже PERM_MIN_PERMUTATIONS: там
+важна не точность хвоста, а то, что p < 0.001; фактическое число — в Perm.
+"""
+
+import itertools
+import math
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from function.correlation import _group_rows, grouped_corr
+from function.tracing import span
+
+PERM_PERMUTATIONS = 9999
+PERM_MIN_PERMUTATIONS = 999
+PERM_MAX_CELLS = 10_000_000  # перестановки × строки на тест
+PERM_STOP_HITS = 20
+PERM_SEED = 2025
+BLOCK_CELLS = 1 << 21  # тесты × перестановки × строки в одном блоке
+TIE_TOLERANCE = 1e-12  # |r| перестановки, равный наблюдаемому, — превышение
+
+PERM_COLUMNS = ["Perm", "p_value"]
+
+
+def _standardize(v: np.ndarray) -> np.ndarray:
+    """Строки матрицы (тесты × наблюдения): центрирование и единичная норма"""
+    v = v - v.mean(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return v / np.sqrt((v * v).sum(axis=1, keepdims=True))
+
+
+def _exceedances(xs: np.ndarray, ys: np.ndarray, threshold: np.ndarray, perms: np.ndarray) -> np.ndarray:
+    """Превышения |r| ≥ threshold (тесты × перестановки блока) — одним `matmul`"""
+    r = np.matmul(ys[:, perms], xs[:, :, None])[..., 0]
+    return np.abs(r) >= threshold[:, None]
+
+
+def _test_bucket(xs: np.ndarray, ys: np.ndarray, n_perm: int, stop_hits: Optional[int],
+                 rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """p-значения и число перестановок для тестов одного размера n"""
+    k, n = xs.shape
+    threshold = np.abs((xs * ys).sum(axis=1)) - TIE_TOLERANCE
+
+    if math.factorial(n) <= n_perm:  # полный перебор: точное p
+        perms = np.array(list(itertools.permutations(range(n))), dtype=np.intp)
+        hits = np.zeros(k, dtype=np.int64)
+        block = max(1, BLOCK_CELLS // (k * n))
+        for start in range(0, len(perms), block):
+            hits += _exceedances(xs, ys, threshold, perms[start:start + block]).sum(axis=1)
+        return hits / len(perms), np.full(k, len(perms))
+
+    hits = np.zeros(k, dtype=np.int64)
+    used = np.zeros(k, dtype=np.int64)
+    stopped = np.zeros(k, dtype=bool)
+    done = 0
+    while done < n_perm:
+        active = np.flatnonzero(~stopped)
+        if not len(active):
+            break
+        # блок растёт, когда активных тестов остаётся мало
+        size = min(n_perm - done, max(1, BLOCK_CELLS // (len(active) * n)))
+        perms = rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+        exceed = _exceedances(xs[active], ys[active], threshold[active], perms)
+        if stop_hits:
+            running = hits[active, None] + np.cumsum(exceed, axis=1)
+            reached = running[:, -1] >= stop_hits
+            # номер перестановки, на которой набрано stop_hits превышений
+            at = np.argmax(running >= stop_hits, axis=1) + 1
+            used[active] += np.where(reached, at, size)
+            hits[active] = np.where(reached, stop_hits, running[:, -1])
+            stopped[active[reached]] = True
+        else:
+            used[active] += size
+            hits[active] += exceed.sum(axis=1)
+        done += size
+
+    p = np.where(stopped, hits / np.maximum(used, 1), (1 + hits) / (1 + used))
+    return p, used
+
+
+def permutation_corr(df: pd.DataFrame, pairs: Sequence[Tuple[str, str]], by: Union[str, Iterable, None] = None,
+                     groups: Optional[Dict[Hashable, np.ndarray]] = None, overall: Optional[Hashable] = None,
+                     n_perm: int = PERM_PERMUTATIONS, stop_hits: Optional[int] = PERM_STOP_HITS,
+                     seed: int = PERM_SEED) -> pd.DataFrame:
+    """`grouped_corr` с перестановочными p-значениями
+
+    К колонкам Group, X, Y, N, r добавляются Perm (число перестановок
+    теста) и p_value (двустороннее). Переставляется второй ряд пары.
+    n_perm — лимит перестановок (для больших групп меньше, см. PERM_MAX_CELLS).
+    stop_hits=None — без ранней остановки, все n_perm перестановок.
+    """
+    result = grouped_corr(df, pairs, by, groups, overall)
+    labels, rows, codes = _group_rows(df, by, groups, overall)
+    n_pairs = len(pairs)
+    if result.empty:
+        return result.reindex(columns=list(result.columns) + PERM_COLUMNS)
+
+    x = np.column_stack([df[a].to_numpy(dtype="float64", na_value=np.nan) for a, _ in pairs])
+    y = np.column_stack([df[b].to_numpy(dtype="float64", na_value=np.nan) for _, b in pairs])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+
+    # тесты по числу полных наблюдений: строки x и y без пропусков в паре
+    buckets: Dict[int, list] = {}
+    for g in range(len(labels)):
+        idx = rows[order[bounds[g]:bounds[g + 1]]]
+        for p in range(n_pairs):
+            xv, yv = x[idx, p], y[idx, p]
+            valid = ~(np.isnan(xv) | np.isnan(yv))
+            if valid.sum() >= 3:
+                buckets.setdefault(int(valid.sum()), []).append((g * n_pairs + p, xv[valid], yv[valid]))
+
+    p_value = np.full(len(result), np.nan)
+    used = np.zeros(len(result), dtype=np.int64)
+    with span("permutation", tests=len(result), sizes=len(buckets), permutations=n_perm):
+        for n, tests in sorted(buckets.items()):
+            pos = np.array([t[0] for t in tests])
+            xs = _standardize(np.vstack([t[1] for t in tests]))
+            ys = _standardize(np.vstack([t[2] for t in tests]))
+            rng = np.random.default_rng(np.random.SeedSequence([seed, n]))
+            limit = min(n_perm, max(PERM_MIN_PERMUTATIONS, PERM_MAX_CELLS // n))
+            p_value[pos], used[pos] = _test_bucket(xs, ys, limit, stop_hits, rng)
+
+    # постоянный ряд: корреляция не определена, и p тоже
+    p_value[np.isnan(result["r"].to_numpy())] = np.nan
+    result["Perm"] = used
+    result["p_value"] = p_value
+    return result
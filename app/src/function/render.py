@@ -0,0 +1,84 @@
+"""
+Параллельная отрисовка графиков matplotlib.
+
+Задание — пара (функция рисования, аргументы); функция строит одну фигуру
+и сохраняет её через `save_figure`. Задания выполняются в рабочих
+процессах с backend Agg, заранее загруженными шрифтами и общим стилем;
+файлы записываются по мере готовности. Внутри рабочего процесса другого
+пула (этап на пуле планировщика) и при workers=1 задания выполняются
+последовательно в текущем процессе: его backend не меняется, стиль
+действует только на время отрисовки.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from function import tracing
+
+# Общий стиль графиков проекта (применяется в каждом рабочем процессе)
+CHART_STYLE: Dict[str, Any] = {
+    "font.family": ["DejaVu Sans"],  # поддержка кириллицы
+    "axes.unicode_minus": False,
+}
+
+Job = Tuple[Callable[..., Any], Tuple[Any, ...]]
+
+
+def init_worker(style: Optional[Dict[str, Any]] = None) -> None:
+    """Инициализация процесса: Agg, стиль и прогрев кэша шрифтов"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import font_manager
+    from function.func import pyplot
+
+    plt = pyplot()
+    plt.rcParams.update(style or CHART_STYLE)
+    for family in plt.rcParams["font.family"]:
+        font_manager.findfont(font_manager.FontProperties(family=family))
+
+
+def _render(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, List[Dict[str, Any]]]:
+    """Выполнение одного задания; события трассировки возвращаются родителю"""
+    from function.func import pyplot
+
+    plt = pyplot()
+    before = set(plt.get_fignums())
+    with tracing.span("render", chart=getattr(func, "__name__", str(func))):
+        try:
+            result = func(*args)
+        finally:
+            for num in set(plt.get_fignums()) - before:  # только фигуры задания
+                plt.close(num)
+    return result, tracing.collect()
+
+
+def render_charts(jobs: Sequence[Job], workers: Optional[int] = None) -> List[Any]:
+    """Отрисовка заданий на пуле процессов; возвращает результаты в порядке готовности
+
+    `workers=None` — по числу ядер (не больше числа заданий), `workers=1` —
+    последовательно в текущем процессе; так же, если текущий процесс сам
+    рабочий процесс пула (второй пул занял бы лишние ядра).
+    """
+    if multiprocessing.parent_process() is not None:
+        workers = 1
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    results = []
+    if workers == 1:
+        from function.func import pyplot
+
+        with pyplot().rc_context(CHART_STYLE):
+            for func, args in jobs:
+                result, events = _render(func, args)
+                tracing.record(events)
+                results.append(result)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [pool.submit(_render, func, args) for func, args in jobs]
+        for fut in as_completed(futures):
+            result, events = fut.result()
+            tracing.record(events)
+            results.append(result)
+    return results
@@ -0,0 +1,151 @@
+"""
+Планировщик этапов конвейера.
+
+Каждый этап объявляет свои входы и выходы по именам; этапы, входы которых
+уже готовы, запускаются одновременно на пуле процессов. Время выполнения
+сводится к длине критического пути вместо суммы всех этапов.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from function import tracing
+
+
+# ──────────────────────────────── STAGES ─────────────────────────────────
+
+@dataclass(frozen=True)
+class Stage:
+    """Этап конвейера: функция, имена входов (позиционные аргументы) и выходов.
+
+    `artifacts` — файлы (пути/glob относительно base), которые создаёт этап;
+    только такие этапы кэшируются в `ArtifactCache`.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    artifacts: Tuple[str, ...] = ()
+
+
+def _unpack(stage: Stage, result: Any) -> Dict[str, Any]:
+    """Раскладывает результат функции этапа по именам выходов."""
+    if not stage.outputs:
+        return {}
+    if len(stage.outputs) == 1:
+        return {stage.outputs[0]: result}
+    if len(result) != len(stage.outputs):
+        raise ValueError(f"Этап {stage.name}: ожидалось {len(stage.outputs)} выходов, получено {len(result)}")
+    return dict(zip(stage.outputs, result))
+
+
+def validate_stages(stages: Iterable[Stage], available: Iterable[str] = ()) -> None:
+    """Проверка графа: уникальные имена и выходы, все входы кем-то производятся."""
+    produced = {name: "<context>" for name in available}
+    names = set()
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"Повторяющееся имя этапа: {stage.name}")
+        names.add(stage.name)
+        for out in stage.outputs:
+            if out in produced:
+                raise ValueError(f"Выход «{out}» производят два этапа: {produced[out]} и {stage.name}")
+            produced[out] = stage.name
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in produced]
+        if missing:
+            raise ValueError(f"Этап {stage.name}: нет источника для входов {missing}")
+
+
+def select_stages(stages: List[Stage], names: Iterable[str]) -> List[Stage]:
+    """Подграф: выбранные этапы и все этапы, от выходов которых они зависят."""
+    names = set(names)
+    unknown = names - {s.name for s in stages}
+    if unknown:
+        raise ValueError(f"Неизвестные этапы: {sorted(unknown)}")
+    by_output = {out: s for s in stages for out in s.outputs}
+    needed, todo = set(), [s for s in stages if s.name in names]
+    while todo:
+        stage = todo.pop()
+        if stage.name not in needed:
+            needed.add(stage.name)
+            todo.extend(by_output[i] for i in stage.inputs if i in by_output)
+    return [s for s in stages if s.name in needed]
+
+
+# ─────────────────────────────── EXECUTION ───────────────────────────────
+
+def _traced_call(name: str, func: Callable[..., Any], *args: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+    """Вызов функции этапа в интервале трассировки; события возвращаются родителю."""
+    with tracing.span(f"stage:{name}"):
+        result = func(*args)
+    return result, tracing.collect()
+
+
+class _InlineExecutor:
+    """Последовательный «пул» в текущем процессе (workers=1, отладка)."""
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        fut: Future = Future()
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as exc:
+            fut.set_exception(exc)
+        return fut
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+
+def run_stages(stages: List[Stage], context: Optional[Dict[str, Any]] = None,
+               workers: Optional[int] = None, cache: Optional[Any] = None) -> Dict[str, Any]:
+    """Выполнение этапов в порядке зависимостей.
+
+    Независимые этапы выполняются параллельно на `ProcessPoolExecutor`
+    (`workers=None` — по числу ядер, `workers=1` — последовательно в текущем
+    процессе). С `cache` (см. `function.cache.ArtifactCache`) этапы с
+    неизменными входами, кодом и артефактами пропускаются.
+    Возвращает контекст со всеми выходами этапов.
+    """
+    context = dict(context or {})
+    validate_stages(stages, context)
+    workers = workers or os.cpu_count() or 1
+    pool = _InlineExecutor() if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+
+    pending = list(stages)
+    running: Dict[Future, Tuple[Stage, Optional[str]]] = {}
+    try:
+        while pending or running:
+            ready = [s for s in pending if all(i in context for i in s.inputs)]
+            for stage in ready:
+                pending.remove(stage)
+                args = [context[i] for i in stage.inputs]
+                key = None
+                if cache is not None and stage.artifacts:
+                    key = cache.key(stage, args)
+                    hit, result = cache.lookup(stage, key)
+                    if hit:
+                        print(f"♻️ Этап {stage.name}: артефакты актуальны, пропуск")
+                        with tracing.span(f"stage:{stage.name}", cached=True):
+                            pass
+                        context.update(_unpack(stage, result))
+                        continue
+                running[pool.submit(_traced_call, stage.name, stage.func, *args)] = (stage, key)
+            if not running:
+                if pending and not any(all(i in context for i in s.inputs) for s in pending):
+                    raise RuntimeError(f"Цикл в графе этапов: {[s.name for s in pending]}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, key = running.pop(fut)
+                result, events = fut.result()
+                tracing.record(events)
+                context.update(_unpack(stage, result))
+                if key is not None:
+                    cache.store(stage, key, result)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return context
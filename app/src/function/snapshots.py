@@ -0,0 +1,213 @@
+"""
+Версии очищенного набора данных (снимки) в `dannye/snapshots/`.
+
+Снимок — таблица, приведённая к каноническому порядку строк (по ключу
+Country, Year); его id — SHA-256 содержимого (колонки, типы, значения).
+Повторный запуск с теми же данными даёт тот же id, и новый файл не
+пишется. Новая версия хранится построчной дельтой к той из последних баз
+с той же схемой, с которой дельта меньше: изменённые и добавленные строки
+целиком (`<id>.parquet`) и ключи удалённых (`<id>.removed.parquet`). Если
+дельта больше половины строк или подходящей базы нет, снимок пишется как
+новая база. Дельты всегда ссылаются на базу, а не друг на друга, поэтому любая
+версия собирается из двух файлов. Файлы — Parquet со сжатием zstd,
+список версий — `catalog.json`.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from function.cache import data_fingerprint
+from function.func import DATA_DIR
+from function.tracing import span
+
+SNAPSHOT_DIR = os.path.join("dannye", "snapshots")
+CATALOG_FILE = "catalog.json"
+SNAPSHOT_KEYS = ("Country", "Year")
+ID_LENGTH = 16
+MAX_DELTA_SHARE = 0.5  # дельта больше этой доли строк → новая база
+MAX_BASE_CANDIDATES = 4  # сколько последних баз пробовать (берётся наименьшая дельта)
+
+
+def snapshot_dir(base: Optional[str] = None) -> str:
+    """Папка снимков; `base=None` — app/data"""
+    return os.path.join(base or DATA_DIR, SNAPSHOT_DIR)
+
+
+def _catalog(path: str) -> List[Dict[str, Any]]:
+    catalog_path = os.path.join(path, CATALOG_FILE)
+    if not os.path.exists(catalog_path):
+        return []
+    with open(catalog_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_catalog(path: str, catalog: List[Dict[str, Any]]) -> None:
+    catalog_path = os.path.join(path, CATALOG_FILE)
+    tmp_path = f"{catalog_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, catalog_path)
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with span("write_parquet", path=path):
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+    os.replace(tmp_path, path)
+
+
+def _read_parquet(path: str) -> pd.DataFrame:
+    with span("read_parquet", path=path):
+        return pd.read_parquet(path, engine="pyarrow")
+
+
+def _canonical(df: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    """Строки в порядке ключа, индекс 0..n-1"""
+    keys = list(keys)
+    if df.duplicated(keys).any():
+        raise ValueError(f"Повторяющиеся ключи {keys} в снимке")
+    return df.sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+def _schema(df: pd.DataFrame) -> List[List[str]]:
+    return [[str(c), str(t)] for c, t in df.dtypes.items()]
+
+
+def _row_hashes(df: pd.DataFrame, keys: Sequence[str]) -> pd.Series:
+    """Хэш каждой строки с индексом по ключу"""
+    return pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(),
+                     index=pd.MultiIndex.from_frame(df[list(keys)]))
+
+
+def _delta(old: pd.DataFrame, new: pd.DataFrame, keys: Sequence[str]):
+    """(изменённые и добавленные строки new, ключи строк old, которых нет в new)"""
+    old_hashes, new_hashes = _row_hashes(old, keys), _row_hashes(new, keys)
+    known = new_hashes.index.isin(old_hashes.index)
+    same = np.zeros(len(new), dtype=bool)
+    same[known] = new_hashes[known].to_numpy() == old_hashes.reindex(new_hashes.index[known]).to_numpy()
+    removed = old.loc[~old_hashes.index.isin(new_hashes.index), list(keys)]
+    return new[~same], removed
+
+
+def _resolve(catalog: List[Dict[str, Any]], version: str) -> Dict[str, Any]:
+    """Запись каталога по id, его префиксу или 'latest'"""
+    if not catalog:
+        raise ValueError("Снимков данных ещё нет")
+    if version == "latest":
+        return catalog[-1]
+    matches = [e for e in catalog if e["id"].startswith(version)]
+    if len(matches) != 1:
+        raise ValueError(f"Снимок '{version}' не найден" if not matches else f"Неоднозначный id снимка: '{version}'")
+    return matches[0]
+
+
+def save_snapshot(df: pd.DataFrame, base: Optional[str] = None, keys: Sequence[str] = SNAPSHOT_KEYS,
+                  label: str = "") -> str:
+    """Сохранение версии набора данных; возвращает id снимка"""
+    path = snapshot_dir(base)
+    os.makedirs(path, exist_ok=True)
+    data = _canonical(df, keys)
+    version = data_fingerprint(data)[:ID_LENGTH]
+    catalog = _catalog(path)
+    if any(e["id"] == version for e in catalog):
+        print(f"🗂️ Снимок данных {version} уже сохранён — без изменений")
+        return version
+
+    entry = {"id": version, "kind": "base", "base": None, "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+             "label": label, "keys": list(keys), "rows": len(data), "schema": _schema(data)}
+    parent, delta = None, None
+    candidates = [e for e in reversed(catalog) if e["kind"] == "base" and e["schema"] == entry["schema"]
+                  and e["keys"] == entry["keys"]][:MAX_BASE_CANDIDATES]
+    for candidate in candidates:
+        with span("snapshot_delta", base=candidate["id"], rows=len(data)):
+            upserts, removed = _delta(_read_parquet(os.path.join(path, f"{candidate['id']}.parquet")), data, keys)
+        size = len(upserts) + len(removed)
+        if size <= MAX_DELTA_SHARE * len(data) and (delta is None or size < len(delta[0]) + len(delta[1])):
+            parent, delta = candidate, (upserts, removed)
+
+    if delta is None:
+        _write_parquet(data, os.path.join(path, f"{version}.parquet"))
+        print(f"🗂️ Снимок данных {version}: база, {len(data)} строк")
+    else:
+        upserts, removed = delta
+        _write_parquet(upserts, os.path.join(path, f"{version}.parquet"))
+        if len(removed):
+            _write_parquet(removed, os.path.join(path, f"{version}.removed.parquet"))
+        entry.update(kind="delta", base=parent["id"], upserted=len(upserts), removed=len(removed))
+        print(f"🗂️ Снимок данных {version}: дельта к {parent['id']} "
+              f"(изменено/добавлено {len(upserts)}, удалено {len(removed)} строк)")
+    _write_catalog(path, catalog + [entry])
+    return version
+
+
+def list_snapshots(base: Optional[str] = None) -> pd.DataFrame:
+    """Каталог версий: id, kind, base, created, label, rows, upserted, removed"""
+    columns = ["id", "kind", "base", "created", "label", "rows", "upserted", "removed"]
+    return pd.DataFrame(_catalog(snapshot_dir(base))).reindex(columns=columns)
+
+
+def load_snapshot(version: str = "latest", base: Optional[str] = None) -> pd.DataFrame:
+    """Набор данных версии (id, префикс id или 'latest') в каноническом порядке"""
+    path = snapshot_dir(base)
+    entry = _resolve(_catalog(path), version)
+    data = _read_parquet(os.path.join(path, f"{entry['id']}.parquet"))
+    if entry["kind"] == "base":
+        return data
+    keys = entry["keys"]
+    parent = _read_parquet(os.path.join(path, f"{entry['base']}.parquet"))
+    dropped = pd.MultiIndex.from_frame(data[keys])
+    if entry.get("removed"):
+        removed = _read_parquet(os.path.join(path, f"{entry['id']}.removed.parquet"))
+        dropped = dropped.append(pd.MultiIndex.from_frame(removed[keys]))
+    kept = parent[~pd.MultiIndex.from_frame(parent[keys]).isin(dropped)]
+    return _canonical(pd.concat([kept, data], ignore_index=True), keys)
+
+
+def diff_snapshots(old: str, new: str, base: Optional[str] = None) -> pd.DataFrame:
+    """Различия двух версий по ячейкам
+
+    Колонки: ключ, Change (added / removed / changed), Column, Old, New;
+    для добавленных и удалённых строк Column пуст.
+    """
+    path = snapshot_dir(base)
+    catalog = _catalog(path)
+    a_entry, b_entry = _resolve(catalog, old), _resolve(catalog, new)
+    keys = a_entry["keys"]
+    if b_entry["keys"] != keys:
+        raise ValueError(f"У снимков разные ключи: {keys} и {b_entry['keys']}")
+    a = load_snapshot(a_entry["id"], base).set_index(keys)
+    b = load_snapshot(b_entry["id"], base).set_index(keys)
+
+    parts = []
+    for change, index in (("added", b.index.difference(a.index)), ("removed", a.index.difference(b.index))):
+        if len(index):
+            parts.append(index.to_frame(index=False).assign(Change=change))
+
+    columns = a.columns.intersection(b.columns)
+    common = a.index.intersection(b.index)
+    if len(common) and len(columns):
+        # ячейки сравниваются только в строках с разными хэшами
+        a_rows = pd.util.hash_pandas_object(a.loc[common, columns], index=False).to_numpy()
+        b_rows = pd.util.hash_pandas_object(b.loc[common, columns], index=False).to_numpy()
+        common = common[a_rows != b_rows]
+    if len(common) and len(columns):
+        old_values = a.loc[common, columns].astype(object)
+        new_values = b.loc[common, columns].astype(object)
+        differs = ~((old_values == new_values) | (old_values.isna() & new_values.isna()))
+        cells = differs.stack()
+        cells = cells[cells]
+        if len(cells):
+            changed = cells.index.to_frame(index=False)
+            changed.columns = keys + ["Column"]
+            changed["Change"] = "changed"
+            changed["Old"] = old_values.stack(dropna=False).reindex(cells.index).to_numpy()
+            changed["New"] = new_values.stack(dropna=False).reindex(cells.index).to_numpy()
+            parts.append(changed)
+
+    result = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    return result.reindex(columns=keys + ["Change", "Column", "Old", "New"])
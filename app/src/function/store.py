@@ -0,0 +1,91 @@
+"""
+Колоночное хранилище исходных данных (Arrow IPC).
+
+`indicators.arrow` — длинная таблица: `Country`, `Year` и по одной колонке
+на индикатор (имена как в панели: GDP_Per_Capita, Inflation, …).
+`countries.arrow` — статические атрибуты стран, одна строка на страну
+(`main_crypto` — список строк). Файлы пишутся без сжатия и открываются
+через memory-map: чтение не копирует числовые колонки, и время загрузки
+почти не зависит от размера панели.
+
+Новые страны, годы и индикаторы добавляются перезаписью файлов через
+`write_store`, без правки кода.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from function.func import DATA_DIR
+from function.tracing import span
+
+STORE_DIR = "istochniki"
+INDICATORS_FILE = "indicators.arrow"
+COUNTRIES_FILE = "countries.arrow"
+
+
+def store_dir(base: Optional[str] = None) -> str:
+    """Папка хранилища; `base=None` — app/data"""
+    base = base or DATA_DIR
+    return os.path.join(base, STORE_DIR)
+
+
+def _read(path: str):
+    """Чтение Arrow IPC файла через memory-map (без копирования буферов)"""
+    import pyarrow as pa
+
+    with span("read_arrow", path=path), pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _write(table, path: str) -> None:
+    """Атомарная запись таблицы в Arrow IPC файл без сжатия"""
+    import pyarrow as pa
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with span("write_arrow", path=tmp_path), pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def load_store(base: Optional[str] = None):
+    """(indicators, countries) — таблицы pyarrow, отображённые в память"""
+    path = store_dir(base)
+    return _read(os.path.join(path, INDICATORS_FILE)), _read(os.path.join(path, COUNTRIES_FILE))
+
+
+def write_store(indicators: pd.DataFrame, countries: pd.DataFrame, base: Optional[str] = None) -> str:
+    """Запись хранилища из DataFrame
+
+    indicators — колонки Country, Year и числовые индикаторы (строка на
+    страну-год); countries — колонка Country и атрибуты стран. Строки
+    индикаторов упорядочиваются по порядку стран в `countries` и по году,
+    так что данные каждой страны лежат непрерывным блоком.
+    """
+    import pyarrow as pa
+
+    order = {code: i for i, code in enumerate(countries["Country"])}
+    unknown = set(indicators["Country"]) - set(order)
+    if unknown:
+        raise ValueError(f"Нет атрибутов для стран: {sorted(unknown)}")
+    indicators = (indicators.assign(_order=indicators["Country"].map(order))
+                  .sort_values(["_order", "Year"]).drop(columns="_order"))
+    indicators["Year"] = indicators["Year"].astype("int32")
+
+    path = store_dir(base)
+    os.makedirs(path, exist_ok=True)
+    _write(pa.Table.from_pandas(indicators, preserve_index=False), os.path.join(path, INDICATORS_FILE))
+    _write(pa.Table.from_pandas(countries.reset_index(drop=True), preserve_index=False),
+           os.path.join(path, COUNTRIES_FILE))
+    return path
+
+
+def countries_dict(countries) -> Dict[str, Dict[str, Any]]:
+    """Словарь атрибутов стран {код: {name_ru, currency, main_crypto, …}}"""
+    result: Dict[str, Dict[str, Any]] = {}
+    for row in countries.to_pylist():
+        code = row.pop("Country")
+        result[code] = row
+    return result
@@ -0,0 +1,158 @@
+"""
+Трассировка этапов конвейера.
+
+`span()` — вложенный интервал, который записывает время (wall), процессорное
+время (CPU) и размер записанного файла. События копятся в буфере процесса;
+планировщик забирает их из рабочих процессов через `collect()` и
+возвращает в родительский процесс через `record()`. Процесс, порождённый
+через fork, начинает с пустым буфером: иначе события родителя вернулись бы
+к нему из каждого рабочего процесса ещё раз. В конце запуска
+`write_reports()` сохраняет JSON-отчёт и файл Chrome trace
+(chrome://tracing, ui.perfetto.dev).
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACE_DIR = "trassirovka"
+
+_events: List[Dict[str, Any]] = []
+_local = threading.local()
+_ids = itertools.count(1)
+
+# рабочие процессы пулов (fork) не наследуют несобранные события родителя
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_events.clear)
+
+
+# ──────────────────────────────── SPANS ──────────────────────────────────
+
+@contextmanager
+def span(name: str, path: Optional[str] = None, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Интервал трассировки; `path` — файл, размер которого учитывается как записанные байты."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    event: Dict[str, Any] = {
+        "id": f"{os.getpid()}-{next(_ids)}",
+        "parent": stack[-1] if stack else None,
+        "name": name,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "ts_us": time.time_ns() // 1000,
+        "args": dict(attrs),
+    }
+    if path is not None:
+        event["args"]["path"] = os.path.basename(path)
+    stack.append(event["id"])
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield event["args"]
+    finally:
+        event["wall_ms"] = (time.perf_counter() - wall0) * 1000
+        event["cpu_ms"] = (time.process_time() - cpu0) * 1000
+        event["bytes"] = os.path.getsize(path) if path is not None and os.path.exists(path) else 0
+        stack.pop()
+        _events.append(event)
+
+
+def collect() -> List[Dict[str, Any]]:
+    """Забрать накопленные события процесса (буфер очищается)."""
+    events = list(_events)
+    _events.clear()
+    return events
+
+
+def record(events: List[Dict[str, Any]]) -> None:
+    """Добавить события, полученные из другого процесса."""
+    _events.extend(events)
+
+
+# ─────────────────────────────── REPORTS ─────────────────────────────────
+
+def _total_bytes(events: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Байты интервала вместе со всеми вложенными интервалами."""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for ev in events:
+        children.setdefault(ev["parent"], []).append(ev)
+
+    totals: Dict[str, int] = {}
+
+    def walk(ev: Dict[str, Any]) -> int:
+        total = ev["bytes"] + sum(walk(ch) for ch in children.get(ev["id"], []))
+        totals[ev["id"]] = total
+        return total
+
+    ids = {ev["id"] for ev in events}
+    for ev in events:
+        if ev["parent"] is None or ev["parent"] not in ids:
+            walk(ev)
+    return totals
+
+
+def write_reports(base: str, events: Optional[List[Dict[str, Any]]] = None) -> Dict[str, str]:
+    """Сохранение JSON-отчёта запуска и Chrome trace в `<base>/trassirovka/`."""
+    events = collect() if events is None else events
+    out_dir = os.path.join(base, TRACE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    totals = _total_bytes(events)
+
+    report = {
+        "spans": [
+            {
+                "name": ev["name"],
+                "id": ev["id"],
+                "parent": ev["parent"],
+                "pid": ev["pid"],
+                "wall_ms": round(ev["wall_ms"], 3),
+                "cpu_ms": round(ev["cpu_ms"], 3),
+                "bytes": ev["bytes"],
+                "bytes_total": totals.get(ev["id"], ev["bytes"]),
+                "args": ev["args"],
+            }
+            for ev in sorted(events, key=lambda e: e["ts_us"])
+        ],
+        "stages": {
+            ev["name"].split(":", 1)[1]: {
+                "wall_ms": round(ev["wall_ms"], 3),
+                "cpu_ms": round(ev["cpu_ms"], 3),
+                "bytes_total": totals.get(ev["id"], 0),
+                "pid": ev["pid"],
+                "cached": bool(ev["args"].get("cached")),
+            }
+            for ev in events if ev["name"].startswith("stage:")
+        },
+    }
+    report_path = os.path.join(out_dir, "run_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    trace = [
+        {"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+         "args": {"name": "main" if pid == os.getpid() else f"worker {pid}"}}
+        for pid in sorted({ev["pid"] for ev in events})
+    ]
+    trace += [
+        {
+            "name": ev["name"],
+            "cat": ev["name"].split(":", 1)[0],
+            "ph": "X",
+            "ts": ev["ts_us"],
+            "dur": round(ev["wall_ms"] * 1000),
+            "pid": ev["pid"],
+            "tid": ev["tid"],
+            "args": dict(ev["args"], cpu_ms=round(ev["cpu_ms"], 3), bytes=totals.get(ev["id"], ev["bytes"])),
+        }
+        for ev in events
+    ]
+    trace_path = os.path.join(out_dir, "chrome_trace.json")
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    print(f"⏱️ Трассировка сохранена: {report_path}, {trace_path}")
+    return {"report": report_path, "trace": trace_path}
@@ -0,0 +1,6 @@
+"""Модули проекта импортируются как в app.py: `from function import ...` из app/src."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
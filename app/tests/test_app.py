@@ -0,0 +1,40 @@
+"""Запуск конвейера (app.main) с выборкой лет на копии источников данных."""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import app
+from function import func
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    for sub in ("istochniki", "indikatory"):
+        shutil.copytree(os.path.join(DATA, sub), tmp_path / sub)
+    monkeypatch.setattr(func, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_single_year_is_rejected(base):
+    with pytest.raises(ValueError, match="не меньше"):
+        app.main(workers=1, years=(2020, 2020), profile="draft")
+    with pytest.raises(SystemExit):
+        app.parse_args(["--years", "2020"])
+
+
+def test_year_range_writes_to_selection_dir(base):
+    app.main(workers=2, years=(2010, 2019), profile="draft")
+    out = base / func.SELECTIONS_DIR / "2010-2019"
+
+    stats = pd.read_excel(out / "otchety" / "full_crypto_analysis_2010_2025.xlsx", sheet_name="Statistika_po_stranam")
+    assert "ВВП_на_душу_2019" in stats.columns and "Рост_с_2010_%" in stats.columns
+    assert "Лидер по адопции в 2019" in (out / "rezultaty" / "osnovnye_vyvody.txt").read_text(encoding="utf-8")
+    assert "Лидер 2019" in (out / "index.html").read_text(encoding="utf-8")
+    # полные артефакты не перезаписаны выборкой
+    assert not (base / "index.html").exists()
+    assert not os.listdir(base / "grafiki") and not os.listdir(base / "otchety")
@@ -0,0 +1,47 @@
+"""Бутстреп-интервалы корреляций (function.bootstrap) против scipy.stats.bootstrap."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from function import bootstrap
+from function.bootstrap import bootstrap_corr
+
+N_BOOT = 20_000
+TOLERANCE = 0.02  # погрешность Монте-Карло квантилей при 20 000 реплик
+
+
+def _pearson(x, y, axis=-1):
+    xc = x - x.mean(axis=axis, keepdims=True)
+    yc = y - y.mean(axis=axis, keepdims=True)
+    return (xc * yc).sum(axis=axis) / np.sqrt((xc * xc).sum(axis=axis) * (yc * yc).sum(axis=axis))
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(7)
+    n = 40
+    x = rng.normal(size=2 * n)
+    y = 0.6 * x + rng.standard_t(4, size=2 * n)  # тяжёлые хвосты: BCa заметно отличается от перцентильного
+    return pd.DataFrame({"Country": np.repeat(["A", "B"], n), "x": x, "y": y})
+
+
+@pytest.mark.parametrize("method, columns", [("percentile", ("CI_low", "CI_high")), ("BCa", ("BCa_low", "BCa_high"))])
+def test_matches_scipy(panel, method, columns):
+    result = bootstrap_corr(panel, [("x", "y")], by="Country", n_boot=N_BOOT, seed=1, workers=1).set_index("Group")
+    for country, rows in panel.groupby("Country"):
+        ref = stats.bootstrap((rows["x"].to_numpy(), rows["y"].to_numpy()), _pearson, paired=True, vectorized=True,
+                              n_resamples=N_BOOT, confidence_level=0.95, method=method,
+                              random_state=np.random.default_rng(2)).confidence_interval
+        low, high = result.loc[country, list(columns)]
+        assert low == pytest.approx(ref.low, abs=TOLERANCE)
+        assert high == pytest.approx(ref.high, abs=TOLERANCE)
+        assert result.loc[country, "B"] == N_BOOT
+
+
+def test_pool_gives_same_intervals(panel, monkeypatch):
+    a = bootstrap_corr(panel, [("x", "y")], by="Country", n_boot=500, seed=3, workers=1)
+    monkeypatch.setattr(bootstrap, "PARALLEL_MIN_CELLS", 0)
+    b = bootstrap_corr(panel, [("x", "y")], by="Country", n_boot=500, seed=3, workers=2)
+    pd.testing.assert_frame_equal(a, b)
@@ -0,0 +1,39 @@
+"""Ключи этапов (function.cache): правка общего помощника инвалидирует ключ."""
+
+import inspect
+
+import pytest
+
+from function import cache
+from function.create import analysis, data_build
+
+
+def _edited(module_name):
+    """inspect.getsource, для которого модуль module_name будто бы правили"""
+    getsource = inspect.getsource
+
+    def patched(obj):
+        source = getsource(obj)
+        return source + "\n# правка\n" if getattr(obj, "__name__", None) == module_name else source
+    return patched
+
+
+@pytest.mark.parametrize("helper", ["function.memo", "function.render", "function.panel", "function.tracing"])
+def test_helper_edit_changes_stage_key(monkeypatch, helper):
+    before = cache.code_fingerprint(analysis.comprehensive_analysis)
+    countries_before = cache.code_fingerprint(data_build.country_analysis_pages, module=False)
+    monkeypatch.setattr(cache.inspect, "getsource", _edited(helper))
+    assert cache.code_fingerprint(analysis.comprehensive_analysis) != before
+    assert cache.code_fingerprint(data_build.country_analysis_pages, module=False) != countries_before
+
+
+def test_transitive_imports_are_hashed():
+    deps = {m.__name__ for m in cache._dependencies([inspect.getmodule(data_build.country_analysis_pages)])}
+    assert {"function.create.data_build", "function.memo", "function.render", "function.panel",
+            "function.cache", "function.func"} <= deps
+
+
+def test_unrelated_edit_keeps_stage_key(monkeypatch):
+    before = cache.code_fingerprint(data_build.country_analysis_pages, module=False)
+    monkeypatch.setattr(cache.inspect, "getsource", _edited("function.create.reports"))
+    assert cache.code_fingerprint(data_build.country_analysis_pages, module=False) == before
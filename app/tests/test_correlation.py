@@ -0,0 +1,59 @@
+"""Корреляции по группам (function.correlation) против pandas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from function.correlation import grouped_corr, rolling_corr
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Country": np.repeat(["A", "B", "C"], 12), "Year": np.tile(np.arange(2010, 2022), 3),
+                       "x": rng.normal(size=36)})
+    df["y"] = 0.5 * df["x"] + rng.normal(size=36)
+    return df.sample(frac=1.0, random_state=1)  # порядок строк не важен
+
+
+def _pandas_rolling(df, window):
+    out = []
+    for country, part in df.sort_values("Year").groupby("Country"):
+        r = part["x"].rolling(window).corr(part["y"])
+        out.append(pd.DataFrame({"Group": country, "Year": part["Year"].to_numpy(), "expected": r.to_numpy()}))
+    return pd.concat(out)
+
+
+def test_rolling_corr_matches_pandas(panel):
+    result = rolling_corr(panel, [("x", "y")], window=4).merge(_pandas_rolling(panel, 4), on=["Group", "Year"])
+    assert len(result) == len(panel)
+    np.testing.assert_allclose(result["r"], result["expected"], atol=1e-12)
+
+
+def test_rolling_corr_skips_rows_without_group(panel):
+    panel = panel.astype({"Country": object})
+    panel.iloc[5, panel.columns.get_loc("Country")] = None
+    result = rolling_corr(panel, [("x", "y")], window=4)
+
+    assert len(result) == len(panel) - 1
+    assert set(result["Group"]) == {"A", "B", "C"}
+    expected = _pandas_rolling(panel.dropna(subset=["Country"]), 4)
+    merged = result.merge(expected, on=["Group", "Year"])
+    np.testing.assert_allclose(merged["r"], merged["expected"], atol=1e-12)
+
+
+def test_grouped_corr_matches_pandas(panel):
+    result = grouped_corr(panel, [("x", "y")], by="Country", overall="all").set_index("Group")["r"]
+    assert result["all"] == pytest.approx(panel["x"].corr(panel["y"]))
+    for country, part in panel.groupby("Country"):
+        assert result[country] == pytest.approx(part["x"].corr(part["y"]))
+
+
+def test_constant_column_gives_nan():
+    # 0.1 × 3: среднее группы 0.10000000000000002, центрированная сумма квадратов — не 0, а ошибка округления
+    df = pd.DataFrame({"Country": ["A"] * 3 + ["B"] * 3, "Year": [1, 2, 3] * 2,
+                       "x": [0.1, 0.1, 0.1, 1.0, 2.0, 3.0], "y": [1.0, 3.0, 2.0, 1.0, 3.0, 2.0]})
+    grouped = grouped_corr(df, [("x", "y")], by="Country").set_index("Group")["r"]
+    assert np.isnan(grouped["A"]) and grouped["B"] == pytest.approx(0.5)
+    rolling = rolling_corr(df, [("x", "y")], window=3).set_index(["Group", "Year"])["r"]
+    assert np.isnan(rolling["A", 3]) and rolling["B", 3] == pytest.approx(0.5)
@@ -0,0 +1,35 @@
+"""Сводная панель Plotly и общий plotly.min.js (function.create.reports, function.func)."""
+
+import os
+
+import plotly.graph_objects as go
+import pytest
+
+from function import func
+from function.create import reports
+
+
+def test_bundle_rewritten_when_plotly_changes(tmp_path, monkeypatch):
+    path = func.plotly_bundle(str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        assert f.readline() == func._plotly_stamp()
+    mtime = os.stat(path).st_mtime_ns
+    assert func.plotly_bundle(str(tmp_path)) == path and os.stat(path).st_mtime_ns == mtime
+
+    monkeypatch.setattr(func, "_plotly_stamp", lambda: "/* plotly 0.0.0 */\n")
+    func.plotly_bundle(str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        assert f.readline() == "/* plotly 0.0.0 */\n"
+
+
+def test_dashboard_includes_every_figure(tmp_path):
+    (tmp_path / "grafiki").mkdir()
+    figures = [go.Figure(go.Scatter(x=[1, 2], y=[3, 4], name=name)) for name, _ in reports.DASHBOARD_FIGURES]
+    figures[1] = None  # этап без фигуры — раздел пропускается
+    reports.interactive_dashboard(str(tmp_path), *figures)
+
+    html = (tmp_path / "grafiki" / "dashboard.html").read_text(encoding="utf-8")
+    assert 'id="spec-rolling"' in html and "Скользящие корреляции" in html
+    assert html.count('<script type="application/json"') == len(figures) - 1
+    with pytest.raises(ValueError):
+        reports.interactive_dashboard(str(tmp_path), *figures[:-1])
@@ -0,0 +1,30 @@
+"""Сборка панели из колоночного хранилища (function.create.data_build)."""
+
+import os
+
+import numpy as np
+import pyarrow as pa
+
+from function import store
+from function.create import data_build
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+def test_rounded_integer_column_keeps_nan():
+    values = data_build._rounded(np.array([1.7, np.nan, -2.5]), None)
+    assert values.dtype == np.float64
+    np.testing.assert_array_equal(values, [1.0, np.nan, -2.0])
+    assert data_build._rounded(np.array([1.7, 3.2]), None).dtype == np.int64
+
+
+def test_missing_indicator_stays_missing_in_panel():
+    indicators, attributes = store.load_store(DATA)
+    gdp = indicators["GDP_Per_Capita"].to_pylist()
+    gdp[0] = None
+    indicators = indicators.set_column(indicators.schema.get_field_index("GDP_Per_Capita"), "GDP_Per_Capita",
+                                       pa.array(gdp, type=indicators.schema.field("GDP_Per_Capita").type))
+    df = data_build.build_panel(indicators, attributes)
+    assert np.isnan(df.loc[0, "GDP_Per_Capita"])
+    assert df["GDP_Per_Capita"].min() > 0  # без INT64_MIN на месте пропуска
+    np.testing.assert_array_equal(df["GDP_Per_Capita"][1:], np.trunc(np.asarray(gdp[1:], dtype=float)))
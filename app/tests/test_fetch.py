@@ -0,0 +1,46 @@
+"""Загрузчик World Bank против локальной замены API (function.mock_worldbank)."""
+
+import pandas as pd
+import pytest
+
+import fetch_data
+from function import fetch, mock_worldbank
+from function.cache import CACHE_DIR
+
+COUNTRIES = ["Ukraine", "Poland", "Norway"]
+INDICATORS = ["Inflation", "GDP_Per_Capita"]
+YEARS = (2015, 2025)
+
+
+def test_second_run_served_from_cache(tmp_path):
+    with mock_worldbank.serve() as server:
+        kwargs = dict(years=YEARS, base_url=server.base_url, source="mock", concurrency=4)
+        first, stats = fetch.fetch_indicators(str(tmp_path), COUNTRIES, INDICATORS, **kwargs)
+        series = len(COUNTRIES) * len(INDICATORS)  # 11 лет помещаются в одну страницу
+        assert stats == {"network": series, "cached": 0}
+        assert server.hits == series
+
+        second, stats = fetch.fetch_indicators(str(tmp_path), COUNTRIES, INDICATORS, **kwargs)
+        assert stats == {"network": 0, "cached": series}
+        assert server.hits == series
+
+    assert (tmp_path / CACHE_DIR / fetch.HTTP_CACHE_DIR / "mock").is_dir()
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns) == ["Country", "Year", *INDICATORS]
+    assert len(first) == len(COUNTRIES) * (YEARS[1] - YEARS[0] + 1)
+    row = first[(first["Country"] == "Poland") & (first["Year"] == 2020)].iloc[0]
+    assert row["Inflation"] == pytest.approx(mock_worldbank._value("POL", "FP.CPI.TOTL.ZG", 2020))
+
+
+def test_fetch_data_writes_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_data, "DATA_DIR", str(tmp_path))
+    out = tmp_path / "worldbank.csv"
+    fetch_data.main(["--mock", "--countries", "Czech,Sweden", "--indicators", "Exports,Unemployment",
+                     "--years", "2020-2022", "--out", str(out)])
+
+    table = pd.read_csv(out)
+    assert list(table.columns) == ["Country", "Year", "Exports", "Unemployment"]
+    assert sorted(table["Country"].unique()) == ["Czech", "Sweden"]
+    assert sorted(table["Year"].unique()) == [2020, 2021, 2022]
+    assert table[["Exports", "Unemployment"]].notna().all().all()
+    assert (tmp_path / CACHE_DIR / fetch.HTTP_CACHE_DIR / "mock").is_dir()
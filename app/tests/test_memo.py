@@ -0,0 +1,43 @@
+"""Кэш статистик запуска (function.memo): параллельные запуски на одной базе."""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from function import memo
+from function.cache import CACHE_DIR
+
+
+@pytest.fixture
+def panel():
+    return pd.DataFrame({"x": [1.0, 2.0, 3.0, 4.0], "y": [2.0, 1.0, 4.0, 3.0]})
+
+
+def test_start_run_keeps_other_runs(tmp_path, panel):
+    runs = tmp_path / CACHE_DIR / memo.RUN_DIR
+    other = runs / "20250101_000000_1"  # идущий запуск другого процесса
+    other.mkdir(parents=True)
+    stale = runs / "20240101_000000_2"
+    stale.mkdir()
+    old = os.path.getmtime(stale) - memo.STALE_AFTER - 60
+    os.utime(stale, (old, old))
+    try:
+        run_id = memo.start_run(str(tmp_path))
+        assert other.is_dir() and not stale.exists()
+        memo.corr(panel, "x", "y")
+        assert len(list((runs / run_id).iterdir())) == 1
+    finally:
+        memo.end_run()
+    assert other.is_dir() and not (runs / run_id).exists()
+
+
+def test_missing_run_dir_is_a_cache_miss(tmp_path, panel):
+    try:
+        run_id = memo.start_run(str(tmp_path))
+        shutil.rmtree(tmp_path / CACHE_DIR / memo.RUN_DIR / run_id)  # удалил другой запуск
+        assert memo.corr(panel, "x", "y") == pytest.approx(panel["x"].corr(panel["y"]))
+        assert memo.corr(panel, "x", "y") == pytest.approx(0.6)
+    finally:
+        memo.end_run()
@@ -0,0 +1,70 @@
+"""Перестановочные тесты корреляций (function.permutation)."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from function import permutation
+from function.permutation import permutation_corr
+
+
+def _panel(sizes, seed=0, slope=0.0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, n in enumerate(sizes):
+        x = rng.normal(size=n)
+        frames.append(pd.DataFrame({"Country": f"C{i}", "x": x, "y": slope * x + rng.normal(size=n)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _brute_force(x, y):
+    observed = abs(np.corrcoef(x, y)[0, 1])
+    hits = [abs(np.corrcoef(x, np.asarray(p))[0, 1]) >= observed - 1e-12 for p in itertools.permutations(y)]
+    return np.mean(hits)
+
+
+def test_exact_enumeration_matches_brute_force():
+    df = _panel([5, 6, 6], seed=1, slope=0.8)
+    result = permutation_corr(df, [("x", "y")], by="Country").set_index("Group")
+    for country, rows in df.groupby("Country"):
+        n = len(rows)
+        assert result.loc[country, "Perm"] == np.prod(range(1, n + 1))
+        assert result.loc[country, "p_value"] == pytest.approx(_brute_force(rows["x"].to_numpy(), rows["y"].to_numpy()))
+
+
+@pytest.mark.parametrize("stop_hits", [None, permutation.PERM_STOP_HITS])
+def test_p_values_in_range(stop_hits):
+    df = _panel([5, 12, 30, 30, 80], seed=2, slope=0.5)
+    result = permutation_corr(df, [("x", "y")], by="Country", overall="Все", n_perm=499, stop_hits=stop_hits)
+    p, used = result["p_value"].to_numpy(), result["Perm"].to_numpy()
+    assert (p >= 1 / (used + 1)).all() and (p <= 1).all()
+    assert (used <= 499).all()
+
+
+def test_early_stopping_on_null():
+    df = _panel([40] * 20, seed=3)  # нет связи: превышения набираются быстро
+    result = permutation_corr(df, [("x", "y")], by="Country", n_perm=9999, stop_hits=20)
+    stopped = result["Perm"] < 9999
+    assert stopped.mean() > 0.9
+    np.testing.assert_allclose(result.loc[stopped, "p_value"], 20 / result.loc[stopped, "Perm"])
+    full = permutation_corr(df, [("x", "y")], by="Country", n_perm=9999, stop_hits=None)
+    assert (full["Perm"] == 9999).all()
+
+
+def test_significant_test_runs_to_the_limit():
+    df = _panel([40], seed=4, slope=3.0)
+    result = permutation_corr(df, [("x", "y")], by="Country", n_perm=2000, stop_hits=20)
+    assert result.loc[0, "Perm"] == 2000 and result.loc[0, "p_value"] == pytest.approx(1 / 2001)
+
+
+def test_cap_limits_permutations_for_large_groups(monkeypatch):
+    df = _panel([50, 500], seed=5, slope=0.5)
+    monkeypatch.setattr(permutation, "PERM_MAX_CELLS", 50 * 1500)
+    result = permutation_corr(df, [("x", "y")], by="Country", n_perm=9999, stop_hits=None).set_index("Group")
+    # min(n_perm, max(PERM_MIN_PERMUTATIONS, PERM_MAX_CELLS // n))
+    assert result.loc["C0", "Perm"] == 1500
+    assert result.loc["C1", "Perm"] == permutation.PERM_MIN_PERMUTATIONS
+    small = permutation_corr(df, [("x", "y")], by="Country", n_perm=1000, stop_hits=None).set_index("Group")
+    assert small.loc["C0", "Perm"] == 1000
@@ -0,0 +1,51 @@
+"""Отрисовка графиков (function.render): пул процессов и последовательный режим."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+from function import render
+from function.func import pyplot
+
+
+def _draw(path):
+    plt = pyplot()
+    plt.figure()
+    plt.plot([1, 2, 3])
+    plt.savefig(path)
+    return os.getpid(), plt.rcParams["axes.unicode_minus"]
+
+
+def _nested(paths):
+    """render_charts из рабочего процесса другого пула"""
+    return os.getpid(), render.render_charts([(_draw, (p,)) for p in paths], workers=4)
+
+
+def test_inline_keeps_backend_and_figures(tmp_path):
+    plt = pyplot()
+    backend = matplotlib.get_backend()
+    own = plt.figure()
+    plt.rcParams["axes.unicode_minus"] = True
+    try:
+        results = render.render_charts([(_draw, (str(tmp_path / f"{i}.png"),)) for i in range(2)], workers=1)
+        assert results == [(os.getpid(), False)] * 2  # стиль проекта на время отрисовки
+        assert matplotlib.get_backend() == backend
+        assert plt.rcParams["axes.unicode_minus"] is True
+        assert plt.get_fignums() == [own.number]
+    finally:
+        plt.close("all")
+        plt.rcParams["axes.unicode_minus"] = False
+
+
+def test_no_nested_pool_in_worker(tmp_path):
+    paths = [str(tmp_path / f"{i}.png") for i in range(3)]
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        worker, results = pool.submit(_nested, paths).result()
+    assert {pid for pid, _ in results} == {worker}
+    assert all(os.path.exists(p) for p in paths)
+
+
+def test_pool_renders_in_workers(tmp_path):
+    results = render.render_charts([(_draw, (str(tmp_path / f"{i}.png"),)) for i in range(2)], workers=2)
+    assert os.getpid() not in {pid for pid, _ in results}
@@ -0,0 +1,90 @@
+"""Версии набора данных (function.snapshots): базы, дельты, сравнение."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from function import snapshots
+from function.export import save
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(0)
+    countries = ["Poland", "Ukraine", "Czech", "Norway"]
+    years = np.arange(2010, 2026, dtype=np.int32)
+    df = pd.DataFrame({
+        "Country": np.repeat(countries, len(years)),
+        "Year": np.tile(years, len(countries)),
+        "Inflation": rng.normal(5, 2, len(countries) * len(years)).round(2),
+        "Crypto_Adoption": rng.uniform(0, 12, len(countries) * len(years)).round(2),
+    })
+    return df.sample(frac=1, random_state=1).reset_index(drop=True)  # порядок строк не важен
+
+
+def _canonical(df):
+    return snapshots._canonical(df, snapshots.SNAPSHOT_KEYS)
+
+
+def test_base_round_trip(tmp_path, panel):
+    version = snapshots.save_snapshot(panel, str(tmp_path), label="v1")
+    entry, = snapshots.list_snapshots(str(tmp_path)).to_dict("records")
+    assert entry["id"] == version and entry["kind"] == "base" and entry["label"] == "v1"
+    pd.testing.assert_frame_equal(snapshots.load_snapshot(version, str(tmp_path)), _canonical(panel))
+
+
+def test_delta_round_trip(tmp_path, panel):
+    first = snapshots.save_snapshot(panel, str(tmp_path))
+    changed = panel[panel["Year"] != 2010].copy()  # удалены строки 2010
+    changed.loc[changed["Country"] == "Poland", "Inflation"] += 1.0
+    added = pd.DataFrame({"Country": ["Sweden"], "Year": np.array([2025], dtype=np.int32),
+                          "Inflation": [1.5], "Crypto_Adoption": [4.2]})
+    changed = pd.concat([changed, added], ignore_index=True)
+
+    second = snapshots.save_snapshot(changed, str(tmp_path))
+    catalog = snapshots.list_snapshots(str(tmp_path)).set_index("id")
+    assert catalog.loc[second, "kind"] == "delta" and catalog.loc[second, "base"] == first
+    assert catalog.loc[second, "upserted"] == 15 + 1 and catalog.loc[second, "removed"] == 4
+    pd.testing.assert_frame_equal(snapshots.load_snapshot(second, str(tmp_path)), _canonical(changed))
+    pd.testing.assert_frame_equal(snapshots.load_snapshot(first, str(tmp_path)), _canonical(panel))
+    pd.testing.assert_frame_equal(snapshots.load_snapshot("latest", str(tmp_path)), _canonical(changed))
+
+
+def test_resave_is_a_no_op(tmp_path, panel):
+    version = snapshots.save_snapshot(panel, str(tmp_path))
+    files = sorted(os.listdir(snapshots.snapshot_dir(str(tmp_path))))
+    assert snapshots.save_snapshot(panel.iloc[::-1], str(tmp_path)) == version
+    assert sorted(os.listdir(snapshots.snapshot_dir(str(tmp_path)))) == files
+    assert len(snapshots.list_snapshots(str(tmp_path))) == 1
+
+
+def test_diff_snapshots(tmp_path, panel):
+    old = snapshots.save_snapshot(panel, str(tmp_path))
+    new_panel = panel[~((panel["Country"] == "Czech") & (panel["Year"] == 2012))].copy()
+    row = (new_panel["Country"] == "Norway") & (new_panel["Year"] == 2020)
+    before = new_panel.loc[row, "Crypto_Adoption"].item()
+    new_panel.loc[row, "Crypto_Adoption"] = 99.0
+    new_panel = pd.concat([new_panel, pd.DataFrame({"Country": ["Sweden"], "Year": np.array([2011], dtype=np.int32),
+                                                    "Inflation": [2.0], "Crypto_Adoption": [0.5]})])
+    new = snapshots.save_snapshot(new_panel, str(tmp_path))
+
+    diff = snapshots.diff_snapshots(old, new, str(tmp_path))
+    by_change = {c: g.drop(columns="Change").reset_index(drop=True) for c, g in diff.groupby("Change")}
+    assert set(by_change) == {"added", "removed", "changed"}
+    assert by_change["added"][["Country", "Year"]].values.tolist() == [["Sweden", 2011]]
+    assert by_change["removed"][["Country", "Year"]].values.tolist() == [["Czech", 2012]]
+    changed = by_change["changed"].iloc[0]
+    assert len(by_change["changed"]) == 1
+    assert (changed["Country"], changed["Year"], changed["Column"]) == ("Norway", 2020, "Crypto_Adoption")
+    assert (changed["Old"], changed["New"]) == (before, 99.0)
+    assert snapshots.diff_snapshots(new, new, str(tmp_path)).empty
+
+
+def test_selection_is_not_snapshotted(tmp_path, panel):
+    (tmp_path / "dannye").mkdir()
+    save.clean_excel(panel, str(tmp_path), selection="Poland_2010-2019")
+    assert not os.path.exists(snapshots.snapshot_dir(str(tmp_path)))
+    save.clean_excel(panel, str(tmp_path))
+    assert len(snapshots.list_snapshots(str(tmp_path))) == 1
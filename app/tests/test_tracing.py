@@ -0,0 +1,41 @@
+"""Трассировка (function.tracing) при выполнении этапов на пуле процессов."""
+
+from collections import Counter
+
+from function import tracing
+from function.scheduler import Stage, run_stages
+
+
+def _traced(name):
+    with tracing.span(f"work:{name}"):
+        return name
+
+
+def _left(base):
+    return _traced("left")
+
+
+def _right(base):
+    return _traced("right")
+
+
+def _join(left, right):
+    return _traced(left + right)
+
+
+def test_worker_events_are_not_duplicated():
+    tracing.collect()
+    with tracing.span("run"):
+        with tracing.span("before"):  # несобранное событие родителя на момент fork
+            pass
+        stages = [Stage("left", _left, ("base",), ("left",)), Stage("right", _right, ("base",), ("right",)),
+                  Stage("join", _join, ("left", "right"), ("joined",))]
+        ctx = run_stages(stages, {"base": "."}, workers=2)
+    events = tracing.collect()
+
+    assert ctx["joined"] == "leftright"
+    ids = Counter(ev["id"] for ev in events)
+    assert not [i for i, n in ids.items() if n > 1]
+    names = Counter(ev["name"] for ev in events)
+    assert names["before"] == 1 and names["run"] == 1
+    assert names["stage:left"] == names["stage:right"] == names["stage:join"] == 1
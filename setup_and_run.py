@@ -20,7 +20,9 @@ def install_libraries():
     'openpyxl>=3.1.0',
     'plotly>=5.15.0',
     'pyyaml>=6.0' ,
-    'jinja2>=3.1.0'  # ← ДОБАВИТЬ для работы с YAML
+    'jinja2>=3.1.0',  # ← ДОБАВИТЬ для работы с YAML
+    'pyarrow>=14.0.0',  # колоночное хранилище данных (Arrow IPC)
+    'aiohttp>=3.9.0'  # конкурентная загрузка индикаторов (fetch_data.py)
 ] # для Excel файлов
 
     